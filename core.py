@@ -7,23 +7,237 @@ from copy import deepcopy
 from iota.Vector  import Vector
 from iota.Entity  import Entity
 from iota.Garbage import Garbage
+from iota.HexList import HexList
 
-Iota = Union[bool, None, Number, str, Tuple, Vector, Entity, Garbage]
+Iota = Union[bool, None, Number, str, Tuple, HexList, Vector, Entity, Garbage]
+
+# types of list iotas. list ops build HexLists, quotes pushed by a block are tuples
+LIST_TYPES = (tuple, HexList)
+
+
+class Stack(list):
+    # list type used for the frame's stack and quote buffer.
+    # while the frame has an open journal its class is swapped to JournaledStack, which records undo entries.
+    # depths count from the top, the top element is at depth 0. deep ops work in place and only move the
+    # elements above the depth
+    __slots__ = ("journal",)
+
+    def pick(self, n: int):
+        # element at depth n
+        return self[-n - 1]
+
+    def dig(self, n: int):
+        # remove and return the element at depth n
+        return self.pop(-n - 1)
+
+    def bury(self, n: int, e):
+        # insert e below the top n elements, at the bottom if the stack is shallower
+        self.insert(max(len(self) - n, 0), e)
+
+    def popn(self, n: int) -> list:
+        # remove and return the top n elements, deepest first
+        start = max(len(self) - n, 0)
+        items = list.__getitem__(self, slice(start, None))
+        list.__delitem__(self, slice(start, None))
+        return items
+
+    def pushn(self, items):
+        self.extend(items)
+
+    def __deepcopy__(self, memo):
+        return Stack([deepcopy(e, memo) for e in self])
+
+
+class JournaledStack(Stack):
+    __slots__ = ()
+
+    def _snapshot(self):
+        # fallback for rarely used mutations, restores the whole list
+        self.journal.append((list.__setitem__, (self, slice(None), list(self))))
+
+    def append(self, e):
+        list.append(self, e)
+        self.journal.append((list.pop, (self,)))
+
+    def extend(self, items):
+        n = len(self)
+        list.extend(self, items)
+        self.journal.append((list.__delitem__, (self, slice(n, None))))
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def popn(self, n: int) -> list:
+        items = Stack.popn(self, n)
+        self.journal.append((list.extend, (self, tuple(items))))
+        return items
+
+    def pop(self, idx=-1):
+        e = list.pop(self, idx)
+        if idx == -1:
+            self.journal.append((list.append, (self, e)))
+        else:
+            if idx < 0:
+                idx += len(self) + 1
+            self.journal.append((list.insert, (self, idx, e)))
+        return e
+
+    def insert(self, idx, e):
+        n = len(self)
+        if idx < 0:
+            idx = max(idx + n, 0)
+        idx = min(idx, n)
+        list.insert(self, idx, e)
+        self.journal.append((list.__delitem__, (self, idx)))
+
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            self._snapshot()
+            list.__delitem__(self, key)
+            return
+        if key < 0:
+            key += len(self)
+        e = self[key]
+        list.__delitem__(self, key)
+        self.journal.append((list.insert, (self, key, e)))
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self._snapshot()
+            list.__setitem__(self, key, value)
+            return
+        if key < 0:
+            key += len(self)
+        self.journal.append((list.__setitem__, (self, key, self[key])))
+        list.__setitem__(self, key, value)
+
+    def clear(self):
+        self._snapshot()
+        list.clear(self)
+
+    def remove(self, e):
+        self._snapshot()
+        list.remove(self, e)
+
+    def reverse(self):
+        self._snapshot()
+        list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        self._snapshot()
+        list.sort(self, *args, **kwargs)
+
+    def __imul__(self, n):
+        self._snapshot()
+        return list.__imul__(self, n)
+
+
+_JOURNALED_LISTS = ("stack", "quote_buffer")
+
+
+class Mishap(Exception):
+    # aborts the whole run. unlike errors raised by an op it isn't rolled back or reported per instruction
+    def __init__(self, kind: str, message: str, token: str = None):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+        self.message = message
+        self.token = token  # the instruction that would have run next
+
+    def __reduce__(self):
+        return Mishap, (self.kind, self.message, self.token)
 
 
 @dataclass
 class VMFrame:
     machine: Any
-    stack: List[Iota] = field(default_factory=list)
+    stack: List[Iota] = field(default_factory=Stack)
     scratch: Iota = None
     hand: Iota = None
     hand_mode: Literal["r", "w", "rw"] = "rw"
     user_definitions: Dict[str, tuple[str]] = field(default_factory=dict)
-    quote_buffer: List[str] = field(default_factory=list)
+    quote_buffer: List[str] = field(default_factory=Stack)
     quote_depth: int = 0
     player: Union["Entity", None] = None
     prng: Any = None
     prng_state: tuple = None
+    # evaluations left before the run is aborted with an EvalBudget mishap, None for no limit
+    eval_budget: int = None
+    # hexworld.World the raycast ops look into, None for no blocks. shared by copies of the frame
+    world: Any = None
+    # undo entries (fn, args) for the instruction being executed, None while no instruction is journaled
+    journal: List[tuple] = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        journal = self.journal
+        if name in _JOURNALED_LISTS:
+            if not isinstance(value, Stack):
+                value = Stack(value)
+            value.journal = journal
+            value.__class__ = Stack if journal is None else JournaledStack
+        if journal is not None:
+            journal.append((object.__setattr__, (self, name, getattr(self, name))))
+        object.__setattr__(self, name, value)
+
+    def begin_journal(self) -> int:
+        # open the journal if needed and return a mark to roll back to
+        if self.journal is None:
+            journal = []
+            object.__setattr__(self, "journal", journal)
+            for name in _JOURNALED_LISTS:
+                lst = getattr(self, name)
+                lst.journal = journal
+                lst.__class__ = JournaledStack
+        return len(self.journal)
+
+    def rollback(self, mark: int):
+        journal = self.journal
+        while len(journal) > mark:
+            fn, args = journal.pop()
+            fn(*args)
+
+    def rollback_stack(self, mark: int):
+        # undo the changes made to the stack since mark, the undo entries of the rest of the frame are kept
+        journal = self.journal
+        entries = journal[mark:]
+        del journal[mark:]
+        stacks = {id(self.stack)}
+        stacks.update(id(args[2]) for fn, args in entries if args[0] is self and args[1] == "stack")
+        kept = []
+        for fn, args in reversed(entries):
+            target = args[0]
+            if (target is self and args[1] == "stack") or (target is not self and id(target) in stacks):
+                fn(*args)
+            else:
+                kept.append((fn, args))
+        kept.reverse()
+        journal.extend(kept)
+
+    def end_journal(self):
+        object.__setattr__(self, "journal", None)
+        for name in _JOURNALED_LISTS:
+            lst = getattr(self, name)
+            lst.journal = None
+            lst.__class__ = Stack
+
+    def copy(self, machine=None) -> "VMFrame":
+        # cheap copy to start a run from. iotas are never mutated in place so only the lists are copied,
+        # DEF rebinds user_definitions so the dict can be shared
+        return VMFrame(
+            self.machine if machine is None else machine,
+            Stack(self.stack),
+            self.scratch,
+            self.hand,
+            self.hand_mode,
+            self.user_definitions,
+            self.quote_buffer.copy(),
+            self.quote_depth,
+            self.player,
+            self.prng,
+            self.prng_state,
+            self.eval_budget,
+            self.world,
+        )
 
     def __deepcopy__(self, memo):
         # override since we don't want secondary instances of the parent machine, or prng instance in saved states
@@ -39,6 +253,8 @@ class VMFrame:
             deepcopy(self.player, memo),
             self.prng,
             deepcopy(self.prng_state, memo),
+            self.eval_budget,
+            self.world,
         )
         return new
 
@@ -53,9 +269,22 @@ class Operation:
     output: List[Iota]
     alias: List[str] = field(default_factory=list)
 
+    # (operand types, deepest first) -> (result types). Number is a real number and never bool, other types are
+    # bool, Vector, tuple ... as they are
+    type_dispatch = None
+
+    # execute without the stack depth and operand type guards. hexoptimizer.infer only runs it when the
+    # operands are proven to match a type_dispatch entry, so it behaves exactly as execute does for them
+    execute_unchecked = None
+
     def execute(self, frame: VMFrame):
         raise NotImplementedError()
 
     def infer_output_type(self, args: list):
-        return self.output.copy()
+        if self.type_dispatch is None:
+            return self.output.copy()
+        r_type = self.type_dispatch.get(tuple(args), None)
+        if r_type is None:
+            raise ValueError(f"{self.mnemonic}: Bad operands")
+        return r_type
 
@@ -4,6 +4,9 @@ import sys
 
 from core import *
 from hexmachine import StackMachine
+from hexprofile import SORT_KEYS
+from hexworld import World
+from hexregion import RegionWorld
 
 
 
@@ -27,6 +30,7 @@ def run_command(machine: StackMachine, line: str):
 
     def _loadstate(args):
         machine.frame = deepcopy(machine.savestates[args[0]])
+        machine.invalidate_code()
 
     def _help(args):
         if len(args) == 0:
@@ -57,6 +61,56 @@ def run_command(machine: StackMachine, line: str):
         elif args[0] == "clear":
             machine.verbose_exec = False
 
+    def _history(args):
+        # !history [count] prints the most recent entries, !history start count prints a page
+        history = machine._history
+        if len(args) >= 2:
+            start, count = int(args[0]), int(args[1])
+        else:
+            count = int(args[0]) if args else 20
+            start = max(history.first, history.total - count)
+        for idx, name in enumerate(history.page(start, count), start=max(start, history.first)):
+            print(f"{idx}: {name}")
+
+    def _cache(args):
+        if args and args[0] == "clear":
+            machine.invalidate_code()
+            machine.code_cache.reset_stats()
+            return
+        for key, val in machine.code_cache.stats().items():
+            print(f"{key}: {val}")
+
+    def _profile(args):
+        # !profile on|off|reset, or !profile [sort] [count] prints the profile sorted by self time by default
+        if args and args[0] in ("on", "off"):
+            machine.profiling = args[0] == "on"
+            return
+        if args and args[0] == "reset":
+            machine.profiler.reset()
+            return
+        sort = args[0] if args and not args[0].isdigit() else "self"
+        if sort not in SORT_KEYS:
+            print(f"Unknown sort key: {sort}, usage: !profile [on|off|reset|{'|'.join(SORT_KEYS)}] [count]")
+            return
+        count = int(args[-1]) if args and args[-1].isdigit() else None
+        print(machine.profiler.format(sort, count))
+
+    def _world(args):
+        # !world filename maps a region file as the frame's world, !world alone gives it an empty one.
+        # the entities of the old world move to the new one
+        entities = machine.frame.world.entities if machine.frame.world is not None else None
+        if not args:
+            world = World()
+        else:
+            path = Path(".") / Path(args[0])
+            if not path.is_file():
+                print(f"{path} not found")
+                return
+            world = RegionWorld(path)
+        if entities is not None:
+            world.entities = entities
+        machine.frame.world = world
+
     commands = {
         "echo": (_echo, "string", "echo a string to stdout"),
         "load": (_load, "filename", "execute a hexcast file"),
@@ -65,6 +119,10 @@ def run_command(machine: StackMachine, line: str):
         "help": (_help, "[operation]", "print a list of commands, or gets a description of an operation"),
         "ops": (_ops, "", "print a list available operations"),
         "verbose": (_verbose_exec, "set|clear", "when set, exec will print every operation"),
+        "cache": (_cache, "[clear]", "print compiled block cache statistics, or clear the cache"),
+        "history": (_history, "[start] [count]", "print the execution history"),
+        "profile": (_profile, "[on|off|reset|sort] [count]", "time ops and definitions, print or reset the profile"),
+        "world": (_world, "[filename]", "load a region file as the world, or clear the world"),
         "quit": (_nop, "", "exits the repl")
     }
 
@@ -109,8 +167,7 @@ def repl(machine: StackMachine):
         tokens = line.split()
 
         try:
-            for token in tokens:
-                machine.process_token(token)
+            machine.run_tokens(tokens)
         except Exception as e:
             print("Error:", e, file=sys.stderr)
 
@@ -131,21 +188,22 @@ def run_file(machine, path: Path):
                     return
                 continue
 
-            tokens = line.strip().split()
-            for token in tokens:
-                try:
-                    if token[0] == '#':
-                        break
-                    machine.process_token(token)
-                except Exception as e:
-                    print("Error:", e, file=sys.stderr)
-                    return
+            tokens = []
+            for token in line.strip().split():
+                if token[0] == '#':
+                    break
+                tokens.append(token)
 
+            try:
+                machine.run_tokens(tokens)
+            except Exception as e:
+                print("Error:", e, file=sys.stderr)
+                return
 
-if __name__ == "__main__":
-    machine = StackMachine()
 
-    from ops import ops_math, ops_logic, ops_stack, ops_list, ops_rw, ops_meta, ops_constants, ops_entity, ops_trig
+def setup_machine(machine: StackMachine):
+    # registers the builtin operations and places the default player, alone in an empty world
+    from ops import ops_math, ops_logic, ops_stack, ops_list, ops_rw, ops_meta, ops_constants, ops_entity, ops_trig, ops_raycast
     load_operations(machine, ops_math)
     load_operations(machine, ops_logic)
     load_operations(machine, ops_stack)
@@ -155,6 +213,7 @@ if __name__ == "__main__":
     load_operations(machine, ops_constants)
     load_operations(machine, ops_entity)
     load_operations(machine, ops_trig)
+    load_operations(machine, ops_raycast)
 
     if not machine.strict:
         from ops import ops_extensions
@@ -165,11 +224,18 @@ if __name__ == "__main__":
         position=Vector(x=5, y=6, z=7),
         position_eyes=Vector(x=5, y=7.67, z=7),
         facing=(Vector(x=5, y=7.67, z=7) + Vector(x=9, y=7.82, z=9)).normalize(),
-        velocity=Vector(x=0, y=0, z=0)
+        velocity=Vector(x=0, y=0, z=0),
+        types=Entity.PLAYER | Entity.LIVING
     )
 
     machine.player = player
+    machine.frame.world = World()
+    machine.frame.world.entities.add(player)
+
 
+if __name__ == "__main__":
+    machine = StackMachine()
+    setup_machine(machine)
 
     if len(sys.argv) > 1:
         path = Path(".") / Path(sys.argv[1])
@@ -0,0 +1,183 @@
+# compiles a hexcast token stream into a flat instruction array for the StackMachine.
+# literals are parsed, quotes are collected and builtins are resolved once at compile time
+# so running the array skips the per-token string handling of process_token.
+
+# "4 5 ADD [ 6 7 8 ] Range"
+# compiles to:
+#  [ (PUSH, 4, "4"), (PUSH, 5, "5"), (OP, <AddOp>, "ADD"),
+#    (PUSH, ("6", "7", "8"), "[ 6 7 8 ]"),
+#    (CALL, None, "RANGE")
+#  ]
+#
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+# opcodes
+PUSH = 0  # push arg onto the stack
+OP = 1    # execute the builtin Operation in arg
+CALL = 2  # late bound by name, user definitions first then builtins
+HALT = 3  # ends an EXEC'd block, at top level it is dispatched like CALL
+FUSED = 4 # superinstruction for the instructions that follow it, see hexoptimizer
+
+Instr = Tuple[int, Any, str]
+
+
+@dataclass
+class Block:
+    source: Tuple[str, ...]
+    code: List[Instr] = field(default_factory=list)
+    # tokens of a quote left open at the end of the source, handed to the quote buffer after running
+    tail: List[str] = field(default_factory=list)
+    # times the block has been run, and its hexnative translation once it is hot (False if it has none)
+    runs: int = 0
+    native: Any = None
+    # evaluations charged for the instructions before each index, see costs
+    costs: List[int] = None
+
+
+def tokenize(source: str) -> Tuple[str, ...]:
+    # tokens of hexcast source, a token starting with # comments out the rest of its line
+    tokens = []
+    for line in source.splitlines():
+        for token in line.split():
+            if token[0] == "#":
+                break
+            tokens.append(token)
+    return tuple(tokens)
+
+
+def quote_text(quoted: Tuple[str, ...]) -> str:
+    return " ".join(("[",) + quoted + ("]",))
+
+
+def costs(block: Block) -> List[int]:
+    # the eval budget is charged one evaluation per source instruction however the block was optimized. a folded
+    # run costs the instructions it stands for, a superinstruction is free as the originals behind it are charged
+    if block.costs is None:
+        total = 0
+        block.costs = [0]
+        for kind, arg, _ in block.code:
+            if kind == FUSED:
+                total += 0 if arg.skip else len(arg.tokens)
+            else:
+                total += 1
+            block.costs.append(total)
+    return block.costs
+
+
+def compile_tokens(machine, tokens) -> Block:
+    source = tuple(token.upper() for token in tokens)
+    definitions = machine.frame.user_definitions
+    operations = machine.operations
+
+    block = Block(source)
+    code = block.code
+    quote = []
+    depth = 0
+    start = 0
+
+    for idx, token in enumerate(source):
+        # Quoting mode
+        if depth >= 1:
+            if token == "[":
+                depth += 1
+            if token == "]":
+                depth -= 1
+
+            if depth == 0:
+                quoted = tuple(quote)
+                quote = []
+                # the quote may only be data, it is compiled through the code cache the first time it is run
+                code.append((PUSH, quoted, quote_text(quoted)))
+            else:
+                quote.append(token)
+            continue
+
+        # Start quote
+        if token == "[":
+            depth += 1
+            start = idx
+            continue
+
+        # Literals
+        if token[0] == "$":
+            code.append((PUSH, token[1:], token))
+        elif token.lstrip('-').isdigit():
+            code.append((PUSH, int(token), token))
+        elif token == "HALT":
+            code.append((HALT, None, token))
+        elif token not in definitions and token in operations:
+            code.append((OP, operations[token], token))
+        else:
+            code.append((CALL, None, token))
+
+    if depth >= 1:
+        block.tail = list(source[start:])
+
+    return block
+
+
+class BlockCache:
+    # LRU of compiled quotes shared by EXEC, THOTH and user definitions.
+    # a quote pushed by a compiled block is the same tuple object on every run, so entries are found by
+    # identity first which skips hashing the tuple. equal quotes from other sources share a Block by value.
+    # builtins shadowed by user definitions are called by name, so entries are also keyed by the shadowed names
+    # (StackMachine.shadowed) of the frame they were compiled for.
+    def __init__(self, size: int = 1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._by_id: "OrderedDict[Tuple[int, frozenset], Tuple[tuple, Block]]" = OrderedDict()
+        self._by_value: Dict[tuple, list] = {}  # (shadowed, quote) -> [Block, number of identity entries]
+
+    def get(self, machine, quote) -> Block:
+        shadowed = machine.shadowed()
+        key = (id(quote), shadowed)
+        entry = self._by_id.get(key)
+        if entry is not None:
+            # the entry holds a reference to the quote, so its id can't be reused by another object
+            self._by_id.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        value_key = (shadowed, quote)
+        try:
+            shared = self._by_value.get(value_key)
+        except TypeError:
+            # quotes holding unhashable iotas are compiled every time
+            self.misses += 1
+            return machine.compile(quote)
+
+        if shared is None:
+            self.misses += 1
+            shared = [machine.compile(quote), 0]
+            self._by_value[value_key] = shared
+        else:
+            self.hits += 1
+        shared[1] += 1
+        self._by_id[key] = (value_key, shared[0])
+
+        while len(self._by_id) > self.size:
+            _, (old, _) = self._by_id.popitem(last=False)
+            old_shared = self._by_value[old]
+            old_shared[1] -= 1
+            if old_shared[1] == 0:
+                del self._by_value[old]
+
+        return shared[0]
+
+    def __len__(self):
+        return len(self._by_value)
+
+    def clear(self):
+        self._by_id.clear()
+        self._by_value.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "blocks": len(self._by_value), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,423 @@
+# entities of a world, for the entity ops.
+# entities are held in a spatial hash of CELL_SIZE cubes keyed by the cell their feet are in, each entity has a
+# handle (its slot) given out by add. a lookup at a point checks the few cells around it and a zone query the cells
+# overlapping its radius, or every occupied cell when that is fewer, so queries cost about as much as what they
+# find rather than the number of entities.
+#
+# entity types are Entity.types flags. every type keeps the cells holding entities of the type, so a query for a type
+# only visits those cells, and every cell keeps the intersection of the types of its entities, so a query for
+# entities without a type skips cells where all of them have it. a count per type ends queries nothing can match.
+#
+# entities = EntityIndex()
+# entities.add(Entity("Cow", Vector(8, 6, 7), Vector(8, 7.3, 7), ..., types=Entity.ANIMAL | Entity.LIVING))
+# entities.at(Vector(8, 7, 7), Entity.ANIMAL)     -> the cow
+# entities.near(Vector(5, 6, 7), 5, Entity.LIVING, exclude=True)   -> [entities in range that aren't living]
+#
+# EntityStore answers the same queries for entities that move. it keeps positions, eyes, facing and velocity in
+# arrays with a row per handle, tick(dt) steps every entity along its velocity at once, and an Entity is only built
+# when a query returns it (and kept until the entity changes). see EntityStore.
+
+from array import array
+import math
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from iota.Entity import Entity
+from iota.Vector import Vector
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CELL_SIZE = 8.0
+REACH = 0.5  # a lookup at a point finds entities within this distance on each axis, as the game's unit box does
+
+Cell = Tuple[int, int, int]
+
+
+class EntityIndex:
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self._inv = 1.0 / cell_size
+        self._entities: List[Optional[Entity]] = []  # by handle, None for free handles
+        self._cell_of: List[Optional[Cell]] = []
+        self._free: List[int] = []
+        self._cells: Dict[Cell, List[int]] = {}
+        self._cell_any: Dict[Cell, int] = {}  # types any entity of the cell has
+        self._cell_all: Dict[Cell, int] = {}  # types every entity of the cell has
+        self._type_counts: Dict[int, int] = {flag: 0 for flag in Entity.TYPES}
+        # per type, the cells holding entities of the type and how many
+        self._type_cells: Dict[int, Dict[Cell, int]] = {flag: {} for flag in Entity.TYPES}
+        self._height = 0.0  # tallest entity so far, feet to eyes
+        self._count = 0
+
+    def _cell(self, pos: Vector) -> Cell:
+        inv = self._inv
+        return math.floor(pos.x * inv), math.floor(pos.y * inv), math.floor(pos.z * inv)
+
+    def _index_cell(self, cell: Cell):
+        # recompute the type masks of a cell after a removal
+        handles = self._cells.get(cell)
+        if not handles:
+            self._cells.pop(cell, None)
+            self._cell_any.pop(cell, None)
+            self._cell_all.pop(cell, None)
+            return
+        entities = self._entities
+        any_types, all_types = 0, -1
+        for h in handles:
+            types = entities[h].types
+            any_types |= types
+            all_types &= types
+        self._cell_any[cell] = any_types
+        self._cell_all[cell] = all_types
+
+    def add(self, entity: Entity) -> int:
+        if self._free:
+            handle = self._free.pop()
+            self._entities[handle] = entity
+        else:
+            handle = len(self._entities)
+            self._entities.append(entity)
+            self._cell_of.append(None)
+        self._place(handle, entity)
+        self._count += 1
+        return handle
+
+    def _place(self, handle: int, entity: Entity):
+        cell = self._cell(entity.position)
+        self._cell_of[handle] = cell
+        handles = self._cells.get(cell)
+        types = entity.types
+        if handles is None:
+            self._cells[cell] = [handle]
+            self._cell_any[cell] = types
+            self._cell_all[cell] = types
+        else:
+            handles.append(handle)
+            self._cell_any[cell] |= types
+            self._cell_all[cell] &= types
+        for flag in Entity.TYPES:
+            if types & flag:
+                self._type_counts[flag] += 1
+                type_cells = self._type_cells[flag]
+                type_cells[cell] = type_cells.get(cell, 0) + 1
+        self._height = max(self._height, entity.position_eyes.y - entity.position.y)
+
+    def _unplace(self, handle: int):
+        entity = self._entities[handle]
+        cell = self._cell_of[handle]
+        self._cells[cell].remove(handle)
+        self._index_cell(cell)
+        for flag in Entity.TYPES:
+            if entity.types & flag:
+                self._type_counts[flag] -= 1
+                type_cells = self._type_cells[flag]
+                type_cells[cell] -= 1
+                if not type_cells[cell]:
+                    del type_cells[cell]
+
+    def remove(self, handle: int):
+        self.get(handle)
+        self._unplace(handle)
+        self._entities[handle] = None
+        self._cell_of[handle] = None
+        self._free.append(handle)
+        self._count -= 1
+
+    def update(self, handle: int, entity: Entity):
+        # replace the entity behind handle, e.g. with one that has moved
+        self.get(handle)
+        self._unplace(handle)
+        self._entities[handle] = entity
+        self._place(handle, entity)
+
+    def get(self, handle: int) -> Entity:
+        entity = self._entities[handle] if 0 <= handle < len(self._entities) else None
+        if entity is None:
+            raise KeyError(handle)
+        return entity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Entity]:
+        return (e for e in self._entities if e is not None)
+
+    def _wanted(self, types: int, exclude: bool):
+        # (cells to search, cell filter, entity filter) for a type filter, None when nothing can match.
+        # the filters are None when every entity of the cells searched is wanted
+        if not types:
+            return self._cells, None, None
+        count = self._type_counts.get(types)
+        if exclude:
+            if count == self._count:
+                return None
+            cell_all = self._cell_all
+            return self._cells, (lambda cell: not cell_all[cell] & types), (lambda e: not e.types & types)
+        if count == 0:
+            return None
+        entity_ok = lambda e: e.types & types
+        if count is not None:
+            return self._type_cells[types], None, entity_ok
+        cell_any = self._cell_any
+        return self._cells, (lambda cell: cell_any[cell] & types), entity_ok
+
+    def _cells_in(self, cells: Dict[Cell, object], lo: Vector, hi: Vector) -> List[Cell]:
+        # the cells of cells overlapping the box from lo to hi
+        (x0, y0, z0), (x1, y1, z1) = self._cell(lo), self._cell(hi)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1) > len(cells):
+            return [c for c in cells if x0 <= c[0] <= x1 and y0 <= c[1] <= y1 and z0 <= c[2] <= z1]
+        ys, zs = range(y0, y1 + 1), range(z0, z1 + 1)
+        return [c for c in ((x, y, z) for x in range(x0, x1 + 1) for y in ys for z in zs) if c in cells]
+
+    def at(self, pos: Vector, types: int = 0, exclude: bool = False) -> Optional[Entity]:
+        # the entity nearest pos whose body, feet to eyes, is within REACH of it, optionally only entities with
+        # (or with exclude, without) any of types
+        wanted = self._wanted(types, exclude)
+        if wanted is None:
+            return None
+        search, cell_ok, entity_ok = wanted
+        x, y, z = pos.x, pos.y, pos.z
+        lo = Vector(x - REACH, y - REACH - self._height, z - REACH)
+        hi = Vector(x + REACH, y + REACH, z + REACH)
+        best, best_handle, best_distance = None, None, math.inf
+        cells, entities = self._cells, self._entities
+        for cell in self._cells_in(search, lo, hi):
+            if cell_ok is not None and not cell_ok(cell):
+                continue
+            for h in cells[cell]:
+                e = entities[h]
+                feet = e.position
+                if (abs(feet.x - x) <= REACH and abs(feet.z - z) <= REACH
+                        and feet.y - REACH <= y <= max(feet.y, e.position_eyes.y) + REACH
+                        and (entity_ok is None or entity_ok(e))):
+                    d = feet.distance_squared(pos)
+                    if d < best_distance or (d == best_distance and h < best_handle):
+                        best, best_handle, best_distance = e, h, d
+        return best
+
+    def near(self, pos: Vector, radius: float, types: int = 0, exclude: bool = False) -> List[Entity]:
+        # entities whose feet are within radius of pos in handle order, optionally only entities with (or with
+        # exclude, without) any of types
+        wanted = self._wanted(types, exclude)
+        if wanted is None or not radius >= 0:
+            return []
+        search, cell_ok, entity_ok = wanted
+        r2 = radius * radius
+        x, y, z = pos.x, pos.y, pos.z
+        cells, entities = self._cells, self._entities
+        found = []
+        # a radius wider than all the occupied cells side by side, such as an infinite one, searches all of them
+        # without working out the cells of the box
+        box = search if radius > len(search) * self.cell_size else self._cells_in(search, pos - radius, pos + radius)
+        for cell in box:
+            if cell_ok is not None and not cell_ok(cell):
+                continue
+            for h in cells[cell]:
+                e = entities[h]
+                feet = e.position
+                dx, dy, dz = feet.x - x, feet.y - y, feet.z - z
+                if dx * dx + dy * dy + dz * dz <= r2 and (entity_ok is None or entity_ok(e)):
+                    found.append(h)
+        found.sort()
+        return [entities[h] for h in found]
+
+
+_NOWHERE = Vector(math.nan, math.nan, math.nan)
+_FREE = Entity(None, _NOWHERE, _NOWHERE, Vector.ZERO, Vector.ZERO)  # what a free row holds
+
+
+class EntityStore:
+    # entities as columns: position, eyes, facing and velocity are (capacity, 3) float arrays with a row per
+    # handle, types an int array, names and data lists. with numpy the steps and queries run over whole columns,
+    # without it the columns are flat array buffers (x, y, z of handle h at 3h) walked in python.
+    # entities all move every tick, so rather than a spatial hash rebuilt each tick queries scan the columns,
+    # which at thousands of entities costs less than a rebuild. free rows hold NaN positions, no query matches them.
+    # the columns can be written to directly, call refresh after to drop the Entities built from the old values
+    COLUMNS = ("position", "eyes", "facing", "velocity")
+
+    def __init__(self, capacity: int = 64):
+        self._names: List[Optional[str]] = []  # by handle, None for free handles
+        self._modes: List[str] = []
+        self._data: list = []
+        self._free: List[int] = []
+        self._views: Dict[int, Entity] = {}  # Entities built since the last change, by handle
+        self._count = 0
+        self._capacity = 0
+        self.position = self.eyes = self.facing = self.velocity = self.types = None
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity: int):
+        size = len(self._names)
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            fill = math.nan if name in ("position", "eyes") else 0.0
+            if np is not None:
+                new = np.full((capacity, 3), fill)
+                if old is not None:
+                    new[:size] = old[:size]
+            else:
+                new = array("d", old[:3 * size] if old is not None else ())
+                new.extend([fill] * (3 * (capacity - size)))
+            setattr(self, name, new)
+        if np is not None:
+            types = np.zeros(capacity, np.int64)
+            if self.types is not None:
+                types[:size] = self.types[:size]
+        else:
+            types = array("q", self.types[:size] if self.types is not None else ())
+            types.extend([0] * (capacity - size))
+        self.types = types
+        self._capacity = capacity
+
+    def _write(self, handle: int, entity: Entity):
+        for name in self.COLUMNS:
+            v = getattr(entity, "position_eyes" if name == "eyes" else name)
+            column = getattr(self, name)
+            if np is not None:
+                column[handle] = (v.x, v.y, v.z)
+            else:
+                column[3 * handle:3 * handle + 3] = array("d", (v.x, v.y, v.z))
+        self.types[handle] = entity.types
+        self._names[handle] = entity.name
+        self._modes[handle] = entity.data_mode
+        self._data[handle] = entity.data
+        self._views[handle] = entity
+
+    def _vector(self, column, handle: int) -> Vector:
+        if np is not None:
+            return Vector(*column[handle].tolist())
+        return Vector(*column[3 * handle:3 * handle + 3])
+
+    def add(self, entity: Entity) -> int:
+        if self._free:
+            handle = self._free.pop()
+        else:
+            handle = len(self._names)
+            if handle == self._capacity:
+                self._grow(2 * self._capacity)
+            self._names.append(None)
+            self._modes.append("")
+            self._data.append(None)
+        self._write(handle, entity)
+        self._count += 1
+        return handle
+
+    def remove(self, handle: int):
+        self.get(handle)
+        self._write(handle, _FREE)
+        del self._views[handle]
+        self._free.append(handle)
+        self._count -= 1
+
+    def update(self, handle: int, entity: Entity):
+        self.get(handle)
+        self._write(handle, entity)
+
+    def get(self, handle: int) -> Entity:
+        view = self._views.get(handle)
+        if view is not None:
+            return view
+        if not 0 <= handle < len(self._names) or self._names[handle] is None:
+            raise KeyError(handle)
+        view = self._views[handle] = Entity(
+            self._names[handle],
+            self._vector(self.position, handle),
+            self._vector(self.eyes, handle),
+            self._vector(self.facing, handle),
+            self._vector(self.velocity, handle),
+            self._modes[handle],
+            self._data[handle],
+            int(self.types[handle]),
+        )
+        return view
+
+    def refresh(self):
+        self._views.clear()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Entity]:
+        return (self.get(h) for h, name in enumerate(self._names) if name is not None)
+
+    def tick(self, dt: float = 1.0, gravity: float = 0.0):
+        # step every entity: velocity changes by gravity (downwards), then position and eyes move by velocity
+        n = len(self._names)
+        if np is not None:
+            velocity = self.velocity[:n]
+            if gravity:
+                velocity[:, 1] -= gravity * dt
+            step = velocity * dt
+            self.position[:n] += step
+            self.eyes[:n] += step
+        else:
+            position, eyes, velocity = self.position, self.eyes, self.velocity
+            if gravity:
+                for i in range(1, 3 * n, 3):
+                    velocity[i] -= gravity * dt
+            for i in range(3 * n):
+                d = velocity[i] * dt
+                position[i] += d
+                eyes[i] += d
+        self._views.clear()
+
+    def _wanted(self, h: int, types: int, exclude: bool) -> bool:
+        return not types or (not self.types[h] & types if exclude else bool(self.types[h] & types))
+
+    def _type_mask(self, types: int, exclude: bool):
+        # rows wanted by a type filter, None for no filter
+        if not types:
+            return None
+        masked = self.types[:len(self._names)] & types
+        return masked == 0 if exclude else masked != 0
+
+    def at(self, pos: Vector, types: int = 0, exclude: bool = False) -> Optional[Entity]:
+        # as EntityIndex.at
+        x, y, z = pos.x, pos.y, pos.z
+        n = len(self._names)
+        if np is None:
+            best, best_distance = None, math.inf
+            position, eyes = self.position, self.eyes
+            for h in range(n):
+                fx, fy, fz = position[3 * h], position[3 * h + 1], position[3 * h + 2]
+                if (abs(fx - x) <= REACH and abs(fz - z) <= REACH
+                        and fy - REACH <= y <= max(fy, eyes[3 * h + 1]) + REACH and self._wanted(h, types, exclude)):
+                    d = (fx - x) * (fx - x) + (fy - y) * (fy - y) + (fz - z) * (fz - z)
+                    if d < best_distance:
+                        best, best_distance = h, d
+            return None if best is None else self.get(best)
+        position = self.position[:n]
+        feet_y = position[:, 1]
+        hit = ((np.abs(position[:, 0] - x) <= REACH) & (np.abs(position[:, 2] - z) <= REACH)
+               & (feet_y - REACH <= y) & (y <= np.maximum(feet_y, self.eyes[:n, 1]) + REACH))
+        mask = self._type_mask(types, exclude)
+        if mask is not None:
+            hit &= mask
+        found = np.flatnonzero(hit)
+        if not found.size:
+            return None
+        d = ((position[found] - (x, y, z)) ** 2).sum(axis=1)
+        return self.get(int(found[np.argmin(d)]))
+
+    def near(self, pos: Vector, radius: float, types: int = 0, exclude: bool = False) -> List[Entity]:
+        # as EntityIndex.near
+        if not radius >= 0:
+            return []
+        x, y, z = pos.x, pos.y, pos.z
+        r2 = min(radius * radius, math.inf)  # radii beyond floats as inf for the numpy columns
+        n = len(self._names)
+        if np is None:
+            position = self.position
+            found = []
+            for h in range(n):
+                dx, dy, dz = position[3 * h] - x, position[3 * h + 1] - y, position[3 * h + 2] - z
+                if dx * dx + dy * dy + dz * dz <= r2 and self._wanted(h, types, exclude):
+                    found.append(h)
+            return [self.get(h) for h in found]
+        hit = ((self.position[:n] - (x, y, z)) ** 2).sum(axis=1) <= r2
+        mask = self._type_mask(types, exclude)
+        if mask is not None:
+            hit &= mask
+        return [self.get(h) for h in np.flatnonzero(hit).tolist()]
@@ -0,0 +1,133 @@
+# bounded execution history for the StackMachine.
+# instructions are interned to integer ids and kept in a fixed size ring buffer.
+# when a spill path is given, entries about to be overwritten are written to disk as zlib compressed pages
+# so the full history of a long session can still be paged back in.
+
+from array import array
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+import zlib
+
+
+class History:
+    def __init__(self, capacity: int = 65536, spill_path: Union[str, Path, None] = None, spill_chunk: int = None):
+        if capacity <= 0:
+            raise ValueError("History capacity must be positive")
+        self.capacity = capacity
+        self.total = 0  # entries ever recorded, the sequence number of the next entry
+        self._ring = array("I", bytes(4 * capacity))
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+        self._spill_path = None if spill_path is None else Path(spill_path)
+        self._spill_chunk = min(spill_chunk or max(1, capacity // 4), capacity)
+        self._spilled = 0  # entries written to disk, always the oldest ones
+        self._pages: List[Tuple[int, int, int, int]] = []  # (first seq, count, file offset, byte size)
+        self._page_cache: Tuple[int, array] = (-1, None)
+        if self._spill_path is not None:
+            self._spill_path.write_bytes(b"")
+
+    def intern(self, name: str) -> int:
+        ident = self._ids.get(name)
+        if ident is None:
+            ident = len(self._names)
+            self._names.append(name)
+            self._ids[name] = ident
+        return ident
+
+    def name(self, ident: int) -> str:
+        return self._names[ident]
+
+    def append(self, name: str):
+        ident = self._ids.get(name)
+        if ident is None:
+            ident = self.intern(name)
+        total = self.total
+        if self._spill_path is not None and total - self._spilled >= self.capacity:
+            self._spill()
+        self._ring[total % self.capacity] = ident
+        self.total = total + 1
+
+    def append_tail(self, count: int, names: List[str]):
+        # record count entries of which only the last ones, names, are known. the rest would be older than the
+        # capacity and can't be read back, so names has to hold the last capacity entries and nothing is spilled
+        if self._spill_path is not None or len(names) < min(count, self.capacity):
+            raise ValueError("History.append_tail needs the last capacity entries and a history that doesn't spill")
+        self.total += count - len(names)
+        for name in names:
+            self.append(name)
+
+    def _spill(self):
+        first = self._spilled
+        count = self._spill_chunk
+        ids = array("I", (self._ring[seq % self.capacity] for seq in range(first, first + count)))
+        data = zlib.compress(ids.tobytes())
+        with self._spill_path.open("ab") as file:
+            offset = file.tell()
+            file.write(data)
+        self._pages.append((first, count, offset, len(data)))
+        self._spilled = first + count
+
+    def _read_page(self, idx: int) -> array:
+        if self._page_cache[0] == idx:
+            return self._page_cache[1]
+        _, _, offset, size = self._pages[idx]
+        with self._spill_path.open("rb") as file:
+            file.seek(offset)
+            ids = array("I")
+            ids.frombytes(zlib.decompress(file.read(size)))
+        self._page_cache = (idx, ids)
+        return ids
+
+    @property
+    def spills(self) -> bool:
+        return self._spill_path is not None
+
+    @property
+    def first(self) -> int:
+        # sequence number of the oldest entry that can still be read
+        if self._spill_path is not None:
+            return 0
+        return max(0, self.total - self.capacity)
+
+    @property
+    def in_memory(self) -> int:
+        # sequence number of the oldest entry still held in the ring
+        return max(0, self.total - self.capacity)
+
+    def __len__(self):
+        return self.total
+
+    def page_ids(self, start: int, count: int) -> List[int]:
+        start = max(start, self.first)
+        end = min(start + max(count, 0), self.total)
+        out = []
+        seq = start
+        ring_start = self.in_memory
+        while seq < end and seq < ring_start:
+            # pages are a fixed chunk size, so the page holding seq can be computed directly
+            idx = seq // self._spill_chunk
+            first, n, _, _ = self._pages[idx]
+            ids = self._read_page(idx)
+            stop = min(end, first + n, ring_start)
+            out.extend(ids[seq - first:stop - first])
+            seq = stop
+        ring = self._ring
+        capacity = self.capacity
+        out.extend(ring[s % capacity] for s in range(seq, end))
+        return out
+
+    def page(self, start: int, count: int) -> List[str]:
+        names = self._names
+        return [names[ident] for ident in self.page_ids(start, count)]
+
+    def tail(self, count: int) -> List[str]:
+        return self.page(self.total - count, count)
+
+    def clear(self):
+        self.total = 0
+        self._spilled = 0
+        self._pages.clear()
+        self._page_cache = (-1, None)
+        if self._spill_path is not None:
+            self._spill_path.write_bytes(b"")
@@ -1,9 +1,26 @@
-from typing import Dict
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Sequence, Union
 import sys
 from random import Random
+from time import perf_counter
 import core
 from core import *
-from copy import deepcopy
+import hexcompiler
+from hexcompiler import Block, BlockCache, PUSH, OP, HALT, FUSED, costs
+import hexoptimizer
+import hexnative
+import hexprofile
+from hexhistory import History
+
+
+@dataclass
+class BatchResult:
+    index: int                # position of the program in the batch
+    stack: list               # final stack, as left by a mishap too
+    mishap: Exception = None  # core.Mishap or the error that ended the program, None if it ran to the end
+    evaluations: int = 0      # instructions run
+    time: float = 0.0         # seconds
 
 
 class StackMachine:
@@ -12,60 +29,327 @@ class StackMachine:
         self.operations: Dict[str, core.Operation] = {}
         self.debug = kwargs.get("debug", True)
         self.strict = kwargs.get("strict", False)
-        self._history = []
+        self._history = History(kwargs.get("history_size", 65536), kwargs.get("history_spill", None))
         self.savestates: Dict[str, VMFrame]  = {}
+        self.code_cache = BlockCache(kwargs.get("code_cache_size", 1024))
+        self._conts = None    # continuation stack of the running executor
+        self._pending = None  # block an op asked to call, picked up by the executor after the op returns
+        self._bindings = 0    # bumped when a user definition shadows a builtin, see rebind
+        self._shadowed = (None, frozenset())  # user definitions and the builtins they shadow
         self.verbose_exec = True
+        self.optimize = kwargs.get("optimize", True)
+        self.native_threshold = kwargs.get("native_threshold", 16)  # None to never use the native tier
+        self.frame.eval_budget = kwargs.get("eval_budget", None)
+        # THOTH over lists of at least thoth_parallel_min elements with a block without effects is split across
+        # thoth_workers processes, None for one per cpu and 0 to never
+        self.thoth_workers = kwargs.get("thoth_workers", None)
+        self.thoth_parallel_min = kwargs.get("thoth_parallel_min", 20000)
+        self._thoth_pool = None  # (setup, pool) of the THOTH worker processes, started by hexpool on first use
+        self.profiling = kwargs.get("profile", False)  # when set, ops and user definitions are timed in profiler
+        self.profiler = hexprofile.Profiler()
         self.frame.prng = Random(kwargs.get("seed", 42))
         self.frame.prng_state = self.frame.prng.getstate()
 
     @property
     def history(self):
-        return self._history.copy()
+        # entries still held in memory, use history_page to read a part of the history without copying all of it
+        return self._history.page(self._history.in_memory, self._history.capacity)
 
     @history.setter
     def history(self, val):
         raise TypeError("StackMachine.history is read only")
 
+    def history_page(self, start: int, count: int):
+        return self._history.page(start, count)
+
     @property
     def player(self):
-        return deepcopy(self.frame.player)
+        return self.frame.player
 
     @player.setter
     def player(self, e):
-        self.frame.player = deepcopy(e)
+        self.frame.player = e
 
 
     def register_op(self, op: Operation):
         self.operations[op.mnemonic] = op
         for alias in op.alias:
             self.operations[alias] = op
+        self._shadowed = (None, frozenset())
 
-    def execute(self, instr):
-        debug = self.debug
-        prev_frame = None
-        if debug:
-            prev_frame = deepcopy(self.frame)
-            self._history.append(instr)
+    def compile(self, tokens) -> Block:
+        block = hexcompiler.compile_tokens(self, tokens)
+        if self.optimize:
+            block = hexoptimizer.optimize(self, block)
+        return block
+
+    def compile_quote(self, quote: tuple) -> Block:
+        return self.code_cache.get(self, quote)
+
+    def invalidate_code(self):
+        self.code_cache.clear()
+
+    def shadowed(self) -> frozenset:
+        # builtins shadowed by the frame's user definitions, compiled blocks call them by name.
+        # DEF rebinds user_definitions, so the set is only worked out again when the dict changes
+        definitions, names = self._shadowed
+        if definitions is not self.frame.user_definitions:
+            definitions = self.frame.user_definitions
+            names = frozenset(name for name in definitions if name in self.operations)
+            self._shadowed = (definitions, names)
+        return names
+
+    def rebind(self):
+        # a user definition now shadows a builtin. running blocks have the builtin bound, the executor
+        # recompiles what is left of them after the current instruction
+        self._bindings += 1
+
+    def run(self, block: Block, in_exec: bool = False, echo: bool = True):
+        # iterative executor. EXEC and user definitions don't recurse into run, they push a continuation
+        # entry which runs once the calling instruction returns, so recursive hexes use constant python stack.
+        #   entry: [block, pc, in_exec, echo, caller]
+        #   in_exec: block is being run by EXEC or THOTH, HALT ends the block and verbose_exec echoes instructions
+        #   caller: (token, journal mark, opened journal, profiler depth) of the instruction that pushed the entry,
+        #           None for the base
+        # with an eval_budget on the frame each source instruction is one evaluation (hexcompiler.costs). a block
+        # is charged up front for the instructions it can afford, the loop stops at the last of them, so the budget
+        # costs nothing per PUSH and superinstruction. ops hand back the uncharged rest of the block while they run.
+        outer = (self._conts, self._pending)
+        conts = [[block, 0, in_exec, echo and in_exec and self.verbose_exec, None]]
+        self._conts = conts
+        self._pending = None
+        history = self._history
+        limited = self.frame.eval_budget is not None
+        bindings = self._bindings
+        profiler = self.profiler if self.profiling else None
+        if profiler is not None:
+            # time every op on its own, see hexprofile
+            base_depth = profiler.depth
+            native_threshold = None
+        else:
+            native_threshold = self.native_threshold
         try:
-            if instr in self.frame.user_definitions:
-                for token in self.frame.user_definitions[instr]:
-                    self.process_token(token)
-            elif instr in self.operations:
-                self.operations[instr].execute(self.frame)
-            else:
-                raise ValueError(f"Unknown instruction: {instr}")
-        except Exception as err:
+            while conts:
+                entry = conts[-1]
+                block, pc, in_exec, echo, caller = entry
+                code = block.code
+                n = len(code)
+                pushed = False
+                if limited:
+                    cost = costs(block)
+                    stop = self._charge(cost, pc, n)
+                else:
+                    stop = n
+                if pc == 0 and native_threshold is not None and stop == n:
+                    native = block.native
+                    if native is None:
+                        block.runs += 1
+                        if block.runs > native_threshold:
+                            native = block.native = hexnative.compile_block(self, block)
+                    if native and native.run(self.frame):
+                        pc = n
+                        if echo:
+                            for t in native.tokens:
+                                print(t)
+                        if self.debug:
+                            for t in native.ops:
+                                history.append(t)
+                while pc < stop:
+                    kind, arg, token = code[pc]
+                    pc += 1
+                    if kind == FUSED:
+                        # on success skip the original instructions, otherwise fall through to them. the
+                        # originals are what is charged, a budget stopping among them runs them instead
+                        if (profiler is None or not arg.skip) and pc + arg.skip <= stop and arg.fast(self.frame):
+                            pc += arg.skip
+                            if echo:
+                                for t in arg.tokens:
+                                    print(t)
+                            if self.debug:
+                                for t in arg.ops:
+                                    history.append(t)
+                        continue
+                    if echo:
+                        print(token)
+                    if kind == PUSH:
+                        self.frame.stack.append(arg)
+                        continue
+                    if kind == HALT and in_exec:
+                        if limited:
+                            self._spend(cost[pc] - cost[stop])
+                            stop = n
+                        break
+
+                    frame = self.frame
+                    opened = False
+                    mark = None
+                    if self.debug:
+                        opened = frame.journal is None
+                        mark = frame.begin_journal()
+                        history.append(token)
+                    if profiler is not None:
+                        profiler.enter(self._profile_key(frame, kind, arg, token))
+                    if limited:
+                        # nested runs (THOTH) spend from the same budget
+                        self._spend(cost[pc] - cost[stop])
+                    try:
+                        if kind == OP:
+                            arg.execute(frame)
+                        else:
+                            self._call_name(frame, token)
+                    except Mishap:
+                        raise
+                    except Exception as err:
+                        self._unwind(conts, err, (token, mark, opened, None))
+
+                    pending = self._pending
+                    if pending is not None:
+                        self._pending = None
+                        if pc == n and caller is not None and not block.tail:
+                            # tail call, reuse this entry. the caller still holds the journal, and the profiler
+                            # records of both instructions are closed when the entry finishes
+                            entry[0], entry[1], entry[2], entry[3] = pending[0], 0, pending[1], pending[2]
+                        else:
+                            entry[1] = pc
+                            depth = None if profiler is None else profiler.depth - 1
+                            conts.append([pending[0], 0, pending[1], pending[2], (token, mark, opened, depth)])
+                        pushed = True
+                        break
+                    if profiler is not None:
+                        profiler.exit()
+                    if opened:
+                        frame.end_journal()
+                    if bindings != self._bindings:
+                        bindings = self._bindings
+                        entry[1] = pc
+                        self._rebind(conts)
+                        pushed = True
+                        break
+                    if limited:
+                        stop = self._charge(cost, pc, n)
+
+                if pushed:
+                    continue
+                if stop < n and pc < n:
+                    raise Mishap("EvalBudget", "evaluation budget exhausted", code[pc][2])
+                conts.pop()
+                for token in block.tail:
+                    self._quote_token(token)
+                if caller is not None:
+                    if caller[2]:
+                        self.frame.end_journal()
+                    if caller[3] is not None:
+                        profiler.exit_to(caller[3])
+        finally:
+            self._conts, self._pending = outer
+            if profiler is not None:
+                profiler.discard_to(base_depth)
+            if outer[0] is None and self.frame.journal is not None:
+                # interrupted by something other than an Exception, don't leave the journal open
+                self.frame.end_journal()
+
+    def _rebind(self, conts):
+        # replace each running block by a block compiled from the rest of its source
+        for entry in conts:
+            block, pc = entry[0], entry[1]
+            pos = 0
+            for kind, arg, token in block.code[:pc]:
+                # a superinstruction in front of its original instructions has no tokens of its own
+                if kind != FUSED or not arg.skip:
+                    pos += len(token.split())
+            entry[0] = self.compile(block.source[pos:])
+            entry[1] = 0
+
+    def _charge(self, cost: List[int], pc: int, n: int) -> int:
+        # charge the budget for the instructions from pc it can afford, returns where the block has to stop
+        stop = bisect_right(cost, cost[pc] + max(self.frame.eval_budget, 0), pc, n + 1) - 1
+        self._spend(cost[stop] - cost[pc])
+        return stop
+
+    def _spend(self, count: int):
+        # spent evaluations are not undone by the journal
+        object.__setattr__(self.frame, "eval_budget", self.frame.eval_budget - count)
+
+    def call(self, block: Block, in_exec: bool = False, echo: bool = True):
+        # run a block on behalf of the executing instruction. inside the executor it is pushed as a
+        # continuation that runs after the instruction returns, otherwise it runs immediately
+        if self._conts is None or self._pending is not None:
+            self.run(block, in_exec, echo)
+        else:
+            self._pending = (block, in_exec, echo and in_exec and self.verbose_exec)
+
+    def _call_name(self, frame: VMFrame, name: str):
+        body = frame.user_definitions.get(name)
+        if body is not None:
+            self.call(self.compile_quote(body))
+        elif name in self.operations:
+            self.operations[name].execute(frame)
+        else:
+            raise ValueError(f"Unknown instruction: {name}")
+
+    def _profile_key(self, frame: VMFrame, kind: int, arg, token: str) -> hexprofile.Key:
+        if kind == OP:
+            return "op", arg.mnemonic
+        if token in frame.user_definitions:
+            return "def", token
+        op = self.operations.get(token)
+        return "op", token if op is None else op.mnemonic
+
+    def _unwind(self, conts, err, instr):
+        # report and roll back the failed instruction, then each instruction waiting on a continuation
+        # in turn, as the nested calls of a recursive executor would
+        self._pending = None
+        while True:
+            token, mark, opened, _ = instr
             print(f"Error: {err}", file=sys.stderr)
-            if debug:
-                if prev_frame is None:
-                    raise RuntimeError("Saved frame was None")
-                self.frame = prev_frame
+            if mark is not None:
+                self.frame.rollback(mark)
                 self._history.append("***")
-            raise err
+            if opened:
+                self.frame.end_journal()
+            err = RuntimeError(f"Error processing token or command: {token}, {err}")
+            instr = conts.pop()[4]
+            if instr is None:
+                raise err
 
-    def process_token(self, token: str):
-        token = token.upper()
-        # Quoting mode
+    def run_batch(self, programs: Iterable[Union[str, Sequence[str]]], initial_frame: VMFrame = None
+                  ) -> Iterator[BatchResult]:
+        # runs each program (source text or tokens) from a copy of initial_frame, the machine's frame by default,
+        # and yields a BatchResult as each one finishes. ops, the code cache and the prng are shared by the batch,
+        # the machine's own frame is left as it was
+        template = self.frame if initial_frame is None else initial_frame
+        frame = self.frame
+        try:
+            for index, program in enumerate(programs):
+                tokens = hexcompiler.tokenize(program) if isinstance(program, str) else tuple(program)
+                run_frame = template.copy(self)
+                budget = sys.maxsize if run_frame.eval_budget is None else run_frame.eval_budget
+                run_frame.eval_budget = budget
+                self.frame = run_frame
+                mishap = None
+                start = perf_counter()
+                try:
+                    self.run(self.compile_quote(tokens), echo=False)
+                except Exception as err:
+                    mishap = err
+                elapsed = perf_counter() - start
+                self.frame = frame
+                yield BatchResult(index, run_frame.stack, mishap, budget - run_frame.eval_budget, elapsed)
+        finally:
+            self.frame = frame
+
+    def run_tokens(self, tokens):
+        # tokens continuing a quote from previous input go to the quote buffer, the rest is compiled
+        idx = 0
+        while self.frame.quote_depth >= 1 and idx < len(tokens):
+            self._quote_token(tokens[idx].upper())
+            idx += 1
+        self.run(self.compile(tokens[idx:]))
+
+    def execute(self, instr):
+        self.run(Block((instr,), [(hexcompiler.CALL, None, instr)]))
+
+    def _quote_token(self, token: str):
         if self.frame.quote_depth >= 1:
             if token == "[":
                 self.frame.quote_depth += 1
@@ -79,20 +363,8 @@ class StackMachine:
                 self.frame.stack.append(quoted)
             else:
                 self.frame.quote_buffer.append(token)
-            return
-
-        # Start quote
-        if token == "[":
+        elif token == "[":
             self.frame.quote_depth += 1
-            return
 
-        # Literals
-        if token[0] == "$":
-            self.frame.stack.append(token[1:])
-        elif token.lstrip('-').isdigit():
-            self.frame.stack.append(int(token))
-        else:
-            try:
-                self.execute(token)
-            except Exception as err:
-                raise RuntimeError(f"Error processing token or command: {token}, {err}")
\ No newline at end of file
+    def process_token(self, token: str):
+        self.run_tokens([token])
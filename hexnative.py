@@ -0,0 +1,224 @@
+# native tier for hot blocks.
+# a block that has run more than StackMachine.native_threshold times and only uses pure builtins is translated to
+# python source, with the stack slots it touches held in local variables. the function reads its operands from the
+# stack, computes everything in locals and only then writes its results back. on a mishap (missing operands, an
+# operand type the op would turn into Garbage, an exception) it returns False before touching the stack, and the
+# interpreter runs the block instead so the mishap plays out exactly as it always does.
+#
+# "2 MUL 1 ADD SIN"
+# compiles to:
+#   def native(frame):
+#       stack = frame.stack
+#       if len(stack) < 1:
+#           return False
+#       i0, = stack[-1:]
+#       try:
+#           f = t_MUL.get((type(i0), type(k0)))
+#           if f is None:
+#               return False
+#           s0 = f(i0, k0)
+#           f = t_ADD.get((type(s0), type(k1)))
+#           ...
+#           if not (type(s1) in (int, float)):
+#               return False
+#           s2 = math.sin(s1)
+#       except Exception:
+#           return False
+#       pop = stack.pop
+#       pop()
+#       stack.append(s2)
+#       return True
+#
+
+from dataclasses import dataclass
+import math
+from typing import Callable, List, Tuple
+
+import core
+from hexcompiler import Block, PUSH, OP, FUSED
+import hexoptimizer
+
+_REALS = "(int, float)"
+_NUMBERS = "(int, float, complex)"
+
+# trig ops without an impl_dispatch table, mnemonic -> (operands, function, checks the operands are in its domain)
+TRIG = {
+    "SIN": (1, "sin", False),
+    "COS": (1, "cos", False),
+    "TAN": (1, "tan", False),
+    "ASIN": (1, "asin", True),
+    "ACOS": (1, "acos", True),
+    "ATAN": (1, "atan", False),
+    "ATAN2": (2, "atan2", False),
+    "LOG": (2, "log", False),
+}
+
+
+@dataclass
+class Native:
+    run: Callable[[core.VMFrame], bool]
+    source: str
+    tokens: Tuple[str, ...]  # echoed by verbose exec
+    ops: Tuple[str, ...]     # recorded in history
+
+
+class _Generator:
+    def __init__(self, machine):
+        self.machine = machine
+        self.lines: List[str] = []
+        self.env = {"Vector": core.Vector, "math": math}
+        self.inputs: List[str] = []  # values read from the stack below the block, top first
+        self.slots: List[str] = []   # names of the values on the stack, deepest first
+        self.consts = 0
+        self.temps = 0
+
+    def const(self, value) -> str:
+        name = f"k{self.consts}"
+        self.consts += 1
+        self.env[name] = value
+        return name
+
+    def temp(self) -> str:
+        name = f"s{self.temps}"
+        self.temps += 1
+        return name
+
+    def take(self, n: int) -> List[str]:
+        while len(self.slots) < n:
+            name = f"i{len(self.inputs)}"
+            self.inputs.append(name)
+            self.slots.insert(0, name)
+        operands = self.slots[len(self.slots) - n:]
+        del self.slots[len(self.slots) - n:]
+        return operands
+
+    def emit(self, line: str):
+        self.lines.append(line)
+
+    def bail_unless(self, cond: str):
+        self.emit(f"if not ({cond}):")
+        self.emit("    return False")
+
+    def op(self, op: core.Operation) -> bool:
+        mnemonic = op.mnemonic
+        module = type(op).__module__
+
+        if mnemonic in hexoptimizer.SHUFFLES and module == "ops.ops_stack":
+            n, order = hexoptimizer.SHUFFLES[mnemonic]
+            operands = self.take(n)
+            self.slots.extend(operands[idx] for idx in order)
+            return True
+
+        if module not in hexoptimizer.FOLD_MODULES or mnemonic in hexoptimizer.FOLD_EXCLUDE:
+            return False
+
+        impl = getattr(op, "impl_dispatch", None)
+        if impl is not None:
+            table = f"t_{mnemonic}"
+            self.env[table] = impl
+            binary = isinstance(next(iter(impl)), tuple)
+            operands = self.take(2 if binary else 1)
+            key = f"(type({operands[0]}), type({operands[1]}))" if binary else f"type({operands[0]})"
+            r = self.temp()
+            self.emit(f"f = {table}.get({key})")
+            self.emit("if f is None:")
+            self.emit("    return False")
+            self.emit(f"{r} = f({', '.join(operands)})")
+            self.slots.append(r)
+            return True
+
+        if mnemonic == "PACKVEC":
+            x, y, z = self.take(3)
+            self.bail_unless(" and ".join(f"type({v}) in {_NUMBERS}" for v in (x, y, z)))
+            r = self.temp()
+            self.emit(f"{r} = Vector({x}, {y}, {z})")
+            self.slots.append(r)
+            return True
+
+        if mnemonic == "UNPACKVEC":
+            v, = self.take(1)
+            self.bail_unless(f"type({v}) is Vector")
+            rs = [self.temp() for _ in range(3)]
+            self.emit(f"{', '.join(rs)} = {v}.x, {v}.y, {v}.z")
+            self.slots.extend(rs)
+            return True
+
+        if mnemonic in TRIG and module == "ops.ops_trig":
+            n, fn, domain = TRIG[mnemonic]
+            operands = self.take(n)
+            self.bail_unless(" and ".join(f"type({v}) in {_REALS}" for v in operands))
+            if domain:
+                self.bail_unless(f"-1 <= {operands[0]} <= 1")
+            r = self.temp()
+            self.emit(f"{r} = math.{fn}({', '.join(operands)})")
+            self.slots.append(r)
+            return True
+
+        if not op.parameters:
+            # constants, run once now
+            frame = core.VMFrame(self.machine)
+            op.execute(frame)
+            self.slots.extend(self.const(v) for v in frame.stack)
+            return True
+
+        return False
+
+    def source(self) -> str:
+        inputs = self.inputs[::-1]  # deepest first, like slots
+        keep = 0
+        while keep < len(inputs) and keep < len(self.slots) and inputs[keep] == self.slots[keep]:
+            keep += 1
+
+        out = ["def native(frame):", "    stack = frame.stack"]
+        if inputs:
+            out.append(f"    if len(stack) < {len(inputs)}:")
+            out.append("        return False")
+            out.append(f"    {', '.join(inputs)}, = stack[-{len(inputs)}:]")
+        if self.lines:
+            out.append("    try:")
+            out.extend(f"        {line}" for line in self.lines)
+            out.append("    except Exception:")
+            out.append("        return False")
+        if len(inputs) > keep:
+            out.append("    pop = stack.pop")
+            out.extend("    pop()" for _ in range(len(inputs) - keep))
+        results = self.slots[keep:]
+        if len(results) == 1:
+            out.append(f"    stack.append({results[0]})")
+        elif results:
+            out.append(f"    stack.extend(({', '.join(results)},))")
+        out.append("    return True")
+        return "\n".join(out) + "\n"
+
+
+def compile_block(machine, block: Block):
+    # returns a Native for the block, or False if it uses anything the native tier can't translate
+    gen = _Generator(machine)
+    tokens = []
+    ops = []
+    for kind, arg, token in block.code:
+        if kind == PUSH:
+            gen.slots.append(gen.const(arg))
+            tokens.append(token)
+        elif kind == FUSED:
+            # superinstructions from peephole are followed by the instructions they stand for, translate those
+            if arg.skip == 0 and arg.values is not None:
+                gen.slots.extend(gen.const(v) for v in arg.values)
+                tokens.extend(arg.tokens)
+                ops.extend(arg.ops)
+            elif arg.skip == 0:
+                return False
+        elif kind == OP:
+            op = arg.op if isinstance(arg, hexoptimizer.Unchecked) else arg
+            if not gen.op(op):
+                return False
+            tokens.append(token)
+            ops.append(token)
+        else:
+            return False
+
+    source = gen.source()
+    code = compile(source, f"<native {' '.join(block.source)[:60]}>", "exec")
+    namespace = dict(gen.env)
+    exec(code, namespace)
+    return Native(namespace["native"], source, tuple(tokens), tuple(ops))
@@ -0,0 +1,414 @@
+# optimization passes over compiled blocks.
+#
+# fold: runs of literals and pure constant, math and trig ops are evaluated at compile time. the run is replaced
+# by a single fused instruction that pushes the results, echo and history still see the original tokens.
+#
+# "PI 4 DIV 1 ADD SIN"
+# optimizes to:
+#  [ (FUSED, <PUSH 1>, "PI 4 DIV 1 ADD SIN") ]
+#
+# results too large to keep in the block (integers over FOLD_MAX_BITS bits) are left to run time, powers and
+# products are estimated before they are computed.
+#
+# infer: stack effect and type inference. the types of the values a block pushes are tracked through the
+# block, ops whose operands are proven to match their type_dispatch run their execute_unchecked variant.
+# anything the pass can't follow (user definitions, EXEC, ops without type information) forgets what is known.
+#
+# "RAND 2 MUL FLOOR"
+# optimizes to:
+#  [ (OP, <GetRandom>, "RAND"), (PUSH, 2, "2"), (OP, <MUL unchecked>, "MUL"), (OP, <FLOOR unchecked>, "FLOOR") ]
+#
+# peephole: common idioms are replaced by a single fused instruction. the fused instruction is placed in front
+# of the original instructions it stands for, if its fast path applies it runs and the executor jumps over them,
+# otherwise execution falls through to the original instructions. so mishaps, garbage and errors behave exactly
+# as they do unfused.
+#
+# "1 COPY DUP LEN 1 SUB SEL"
+# optimizes to:
+#  [ (FUSED, <COPY_N 1>, "1 COPY"), (PUSH, 1, "1"), (OP, <Copy>, "COPY"),
+#    (FUSED, <SEL_LAST 1>, "DUP LEN 1 SUB SEL"), (OP, <DuplicateOp>, "DUP"), (OP, <AbsoluteOp>, "LEN"), ...
+#  ]
+#
+
+from dataclasses import dataclass
+from typing import Callable, List, Tuple
+
+import core
+from hexcompiler import Block, PUSH, OP, FUSED, Instr
+
+# modules whose ops only read and write the stack, minus the ones that don't give the same result every run
+FOLD_MODULES = ("ops.ops_constants", "ops.ops_math", "ops.ops_trig")
+FOLD_EXCLUDE = ("RAND",)
+FOLD_MAX_BITS = 1024
+
+
+# stack shuffles the inference follows, mnemonic -> (operands, operand indices pushed back, deepest first)
+SHUFFLES = {
+    "DROP": (1, ()),
+    "DUP": (1, (0, 0)),
+    "DUP2": (2, (1, 0, 1, 0)),
+    "SWAP": (2, (1, 0)),
+    "ROTATE_RIGHT": (3, (1, 2, 0)),
+    "ROTATE_LEFT": (3, (2, 0, 1)),
+}
+
+
+@dataclass
+class Fused:
+    mnemonic: str
+    fast: Callable[[core.VMFrame], bool]  # runs the idiom and returns True, or returns False without side effects
+    skip: int                             # number of original instructions that follow
+    tokens: Tuple[str, ...]               # original tokens, echoed by verbose exec
+    ops: Tuple[str, ...]                  # tokens of the original instructions recorded in history
+    values: tuple = None                  # values pushed by a folded run
+
+    def __repr__(self):
+        return f"<{self.mnemonic}>"
+
+
+class Unchecked:
+    # an op with operands proven by infer, the executor calls execute like any other op
+    __slots__ = ("op", "mnemonic", "execute")
+
+    def __init__(self, op: core.Operation):
+        self.op = op
+        self.mnemonic = op.mnemonic
+        self.execute = op.execute_unchecked
+
+    def __repr__(self):
+        return f"<{self.mnemonic} unchecked>"
+
+
+def _is_int(instr: Instr) -> bool:
+    return instr[0] == PUSH and type(instr[1]) is int
+
+
+def _is_op(instr: Instr, mnemonic: str) -> bool:
+    return instr[0] == OP and instr[1].mnemonic == mnemonic
+
+
+def _copy_n(n: int):
+    # n COPY
+    if n > 0:
+        def fast(frame):
+            stack = frame.stack
+            if len(stack) <= n:
+                return False
+            stack.append(stack.pick(n))
+            return True
+    elif n < 0:
+        def fast(frame):
+            stack = frame.stack
+            if not stack:
+                return False
+            stack.bury(1 - n, stack[-1])
+            return True
+    else:
+        def fast(frame):
+            return True
+    return fast
+
+
+def _move_n(n: int):
+    # n MOVE
+    if n > 0:
+        def fast(frame):
+            stack = frame.stack
+            if len(stack) <= n:
+                return False
+            stack.append(stack.dig(n))
+            return True
+    elif n < 0:
+        def fast(frame):
+            stack = frame.stack
+            if not stack:
+                return False
+            stack.bury(-n, stack.pop())
+            return True
+    else:
+        def fast(frame):
+            return True
+    return fast
+
+
+def _select_n(n: int):
+    # n SEL
+    def fast(frame):
+        stack = frame.stack
+        if not stack or type(stack[-1]) not in core.LIST_TYPES:
+            return False
+        lst = stack[-1]
+        if not -len(lst) <= n < len(lst):
+            return False
+        stack[-1] = lst[n]
+        return True
+    return fast
+
+
+def _select_from_end(k: int):
+    # DUP LEN k SUB SEL, select the k-th element from the end of the list on top of the stack
+    def fast(frame):
+        stack = frame.stack
+        if not stack or type(stack[-1]) not in core.LIST_TYPES:
+            return False
+        lst = stack[-1]
+        idx = len(lst) - k
+        if not -len(lst) <= idx < len(lst):
+            return False
+        stack[-1] = lst[idx]
+        return True
+    return fast
+
+
+def _copy_bottom(frame):
+    # HEIGHT 1 SUB COPY
+    stack = frame.stack
+    if len(stack) < 2:
+        return False
+    stack.append(stack[0])
+    return True
+
+
+def _push_values(values: tuple):
+    def fast(frame):
+        frame.stack.extend(values)
+        return True
+    return fast
+
+
+def _match(code: List[Instr], idx: int):
+    # returns (mnemonic, fast, span) for the idiom starting at idx or None
+    window = code[idx:idx + 5]
+
+    if (len(window) >= 5 and _is_op(window[0], "DUP") and _is_op(window[1], "ABS") and _is_int(window[2])
+            and _is_op(window[3], "SUB") and _is_op(window[4], "SEL")):
+        k = window[2][1]
+        return f"SEL_FROM_END {k}", _select_from_end(k), 5
+
+    if (len(window) >= 4 and _is_op(window[0], "HEIGHT") and _is_int(window[1]) and window[1][1] == 1
+            and _is_op(window[2], "SUB") and _is_op(window[3], "COPY")):
+        return "COPY_BOTTOM", _copy_bottom, 4
+
+    if len(window) >= 2 and _is_int(window[0]):
+        n = window[0][1]
+        if _is_op(window[1], "COPY"):
+            return f"COPY_N {n}", _copy_n(n), 2
+        if _is_op(window[1], "MOVE"):
+            return f"MOVE_N {n}", _move_n(n), 2
+        if _is_op(window[1], "SEL"):
+            return f"SEL_N {n}", _select_n(n), 2
+
+    return None
+
+
+def peephole(machine, block: Block) -> Block:
+    code = block.code
+    out = []
+    idx = 0
+    while idx < len(code):
+        found = _match(code, idx)
+        if found is None:
+            out.append(code[idx])
+            idx += 1
+            continue
+        mnemonic, fast, span = found
+        original = code[idx:idx + span]
+        fused = Fused(
+            mnemonic,
+            fast,
+            span,
+            tuple(token for _, _, token in original),
+            tuple(token for kind, _, token in original if kind != PUSH),
+        )
+        out.append((FUSED, fused, " ".join(fused.tokens)))
+        out.extend(original)
+        idx += span
+    block.code = out
+    return block
+
+
+_BOTTOM = object()  # marks the bottom of the scratch stack, an op reaching it needs values from outside the run
+
+
+def _foldable(op: core.Operation) -> bool:
+    return type(op).__module__ in FOLD_MODULES and op.mnemonic not in FOLD_EXCLUDE
+
+
+def _dispatch_type(value):
+    # type of a value in the type_dispatch vocabulary, None for values the tables don't describe
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, (int, float)):
+        return core.Number
+    if isinstance(value, core.Vector):
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (value.x, value.y, value.z)):
+            return core.Vector
+        return None
+    return type(value)
+
+
+def _too_big(value) -> bool:
+    if type(value) is int:
+        return value.bit_length() > FOLD_MAX_BITS
+    if type(value) is core.Vector:
+        return any(type(v) is int and v.bit_length() > FOLD_MAX_BITS for v in (value.x, value.y, value.z))
+    return False
+
+
+def _ints(value) -> tuple:
+    # the integers in an operand, its components for a vector
+    if type(value) is int:
+        return (value,)
+    if type(value) is core.Vector:
+        return tuple(v for v in (value.x, value.y, value.z) if type(v) is int)
+    return ()
+
+
+def _result_bits(op: core.Operation, stack: list) -> int:
+    # estimated size of the integers EXP and MUL would make of the operands on top of stack, 0 for other ops.
+    # checked before folding so a huge power isn't computed at compile time only to be thrown away
+    if op.mnemonic not in ("EXP", "MUL") or len(stack) < 3:
+        return 0
+    a, b = stack[-2], stack[-1]
+    bits = max((v.bit_length() for v in _ints(a)), default=0)
+    if op.mnemonic == "EXP":
+        return bits * max(_ints(b), default=0)
+    return bits + max((v.bit_length() for v in _ints(b)), default=0)
+
+
+def _fold_op(frame: core.VMFrame, op: core.Operation) -> bool:
+    # runs op on the scratch frame, returns False and leaves the frame as it was if the op can't be folded
+    stack = frame.stack
+    dispatch = getattr(op, "type_dispatch", None)
+    if dispatch:
+        # operands the op has no result type for would give Garbage, leave them to run time
+        n = len(next(iter(dispatch)))
+        if len(stack) <= n:
+            return False
+        try:
+            op.infer_output_type([_dispatch_type(v) for v in stack[-n:]])
+        except ValueError:
+            return False
+
+    if _result_bits(op, stack) > FOLD_MAX_BITS:
+        return False
+
+    before = list(stack)
+    try:
+        op.execute(frame)
+    except Exception:
+        frame.stack = before
+        return False
+    if (not stack or stack[0] is not _BOTTOM
+            or any(type(v) is core.Garbage or _too_big(v) for v in stack)):
+        frame.stack = before
+        return False
+    return True
+
+
+def fold(machine, block: Block) -> Block:
+    # a block that can't be folded runs as compiled
+    try:
+        block.code = _fold(machine, block.code)
+    except Exception:
+        pass
+    return block
+
+
+def _fold(machine, code: List[Instr]) -> List[Instr]:
+    out = []
+    frame = core.VMFrame(machine)
+    run: List[Instr] = []
+
+    def flush():
+        if any(kind == OP for kind, _, _ in run):
+            values = tuple(frame.stack[1:])
+            fused = Fused(
+                f"PUSH {len(values)}",
+                _push_values(values),
+                0,
+                tuple(token for _, _, token in run),
+                tuple(token for kind, _, token in run if kind == OP),
+                values,
+            )
+            out.append((FUSED, fused, " ".join(fused.tokens)))
+        else:
+            out.extend(run)
+        run.clear()
+        frame.stack = [_BOTTOM]
+
+    frame.stack = [_BOTTOM]
+    for instr in code:
+        kind, arg, _ = instr
+        if kind == PUSH:
+            frame.stack.append(arg)
+            run.append(instr)
+            continue
+        if kind == OP and _foldable(arg) and _fold_op(frame, arg):
+            run.append(instr)
+            continue
+        flush()
+        out.append(instr)
+    flush()
+    return out
+
+
+def _type_of(t) -> type:
+    # declared output type to the type_dispatch vocabulary, None when it isn't a single concrete type
+    if not isinstance(t, type):
+        return None
+    if t is bool:
+        return bool
+    if issubclass(t, core.Number):
+        return core.Number
+    return t
+
+
+def infer(machine, block: Block) -> Block:
+    code = block.code
+    out = []
+    known: list = []  # types of the values on top of the stack pushed by this block, deepest first
+
+    for instr in code:
+        kind, arg, token = instr
+        if kind == PUSH:
+            known.append(_dispatch_type(arg))
+        elif kind == FUSED and arg.values is not None:
+            known.extend(_dispatch_type(v) for v in arg.values)
+        elif kind == OP and arg.mnemonic in SHUFFLES and type(arg).__module__ == "ops.ops_stack":
+            n, order = SHUFFLES[arg.mnemonic]
+            if len(known) < n:
+                known = []
+            else:
+                operands = known[len(known) - n:]
+                del known[len(known) - n:]
+                known.extend(operands[idx] for idx in order)
+        elif kind == OP and type(arg).__module__ in FOLD_MODULES:
+            dispatch = arg.type_dispatch
+            if dispatch is None:
+                # constants, their declared output is exact
+                if arg.parameters:
+                    known = []
+                else:
+                    known.extend(_type_of(t) for t in arg.output)
+            else:
+                n = len(next(iter(dispatch)))
+                operands = tuple(known[len(known) - n:]) if len(known) >= n else None
+                result = dispatch.get(operands) if operands is not None else None
+                if result is None:
+                    known = []
+                else:
+                    del known[len(known) - n:]
+                    known.extend(result)
+                    if arg.execute_unchecked is not None:
+                        instr = (OP, Unchecked(arg), token)
+        else:
+            known = []
+        out.append(instr)
+
+    block.code = out
+    return block
+
+
+def optimize(machine, block: Block) -> Block:
+    return peephole(machine, infer(machine, fold(machine, block)))
@@ -0,0 +1,275 @@
+# runs sweeps of independent hexcast programs across worker processes.
+# a sweep is every combination of program, frame template and seed. the programs and templates are sent to each
+# worker once when the pool starts, a worker builds its own machine and compiles the programs into its code cache,
+# after that a job is just three indices. each job starts from a fresh copy of its template with the prng seeded
+# from the job's seed, so results only depend on the job and never on which worker ran it or how many there are.
+# results are yielded in sweep order as they come in.
+#
+# python hexpool.py script.hc [script.hc ...] --seeds 0:100 --workers 4
+#
+# the pool also runs THOTH over large lists. a block whose ops don't touch anything but the stack (and reads of the
+# frame, which the workers get a copy of) gives every element a result independent of the others, so the list is
+# split into one chunk per worker, each worker maps its chunk with THOTH and the results are concatenated. the
+# workers are started once per machine and kept, the ops and machine options go to them when they start, and the
+# frame and block of a THOTH are pickled once and decoded once by each worker. the history entries and evaluations
+# of the workers are added to the machine's as the serial loop would have. if a chunk ends in an error or mishap
+# the list is mapped again in process, which is safe as the block has no effects, so errors play out exactly as
+# they do serially.
+#
+
+import argparse
+from dataclasses import dataclass
+from itertools import chain
+import multiprocessing
+import os
+from pathlib import Path
+import pickle
+from random import Random
+import sys
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import weakref
+
+import core
+import hexcompiler
+from hexcompiler import Block, OP, CALL
+import hexoptimizer
+from hexmachine import StackMachine
+from hexcaster import format_stack, setup_machine
+from hexregion import RegionWorld
+
+
+@dataclass
+class SweepResult:
+    program: int              # indices into the programs and templates of the sweep
+    template: int
+    seed: int                 # None runs with the template's prng state
+    stack: list
+    mishap: Exception = None
+    evaluations: int = 0
+    time: float = 0.0
+
+
+def _frame_state(frame: core.VMFrame, world: bool = True) -> tuple:
+    # the parts of a template frame sent to the workers, a frame holds its machine and can't be pickled whole
+    return (list(frame.stack), frame.scratch, frame.hand, frame.hand_mode, dict(frame.user_definitions),
+            frame.player, frame.prng_state, frame.eval_budget, frame.world if world else None)
+
+
+def _frame_from_state(machine: StackMachine, state: tuple) -> core.VMFrame:
+    stack, scratch, hand, hand_mode, user_definitions, player, prng_state, eval_budget, world = state
+    return core.VMFrame(machine, stack, scratch, hand, hand_mode, user_definitions, player=player,
+                        prng=machine.frame.prng, prng_state=prng_state, eval_budget=eval_budget, world=world)
+
+
+_worker = None  # (machine, programs, templates) of this worker process
+
+
+def _init_worker(programs: List[Tuple[str, ...]], templates: List[tuple], options: dict):
+    global _worker
+    machine = StackMachine(**options)
+    setup_machine(machine)
+    for tokens in programs:
+        machine.compile_quote(tokens)
+    _worker = (machine, programs, [_frame_from_state(machine, state) for state in templates])
+
+
+def _run_job(job: Tuple[int, int, int]) -> SweepResult:
+    machine, programs, templates = _worker
+    program, template, seed = job
+    frame = templates[template]
+    if seed is not None:
+        frame = frame.copy()
+        frame.prng_state = Random(seed).getstate()
+    result = next(machine.run_batch((programs[program],), frame))
+    return SweepResult(program, template, seed, list(result.stack), result.mishap, result.evaluations, result.time)
+
+
+def run_sweep(programs: Iterable[Union[str, Sequence[str]]], templates: Iterable[core.VMFrame] = None,
+              seeds: Iterable[int] = (None,), workers: int = None, chunksize: int = 16,
+              **machine_options) -> Iterator[SweepResult]:
+    # programs are source text or tokens, templates default to the frame of a freshly set up machine.
+    # workers=0 runs the sweep in this process, None uses one worker per cpu
+    programs = [hexcompiler.tokenize(p) if isinstance(p, str) else tuple(p) for p in programs]
+    if templates is None:
+        machine = StackMachine(**machine_options)
+        setup_machine(machine)
+        templates = [machine.frame]
+    templates = [_frame_state(frame) for frame in templates]
+    seeds = list(seeds)
+    jobs = [(p, t, seed) for p in range(len(programs)) for t in range(len(templates)) for seed in seeds]
+
+    if workers == 0:
+        _init_worker(programs, templates, machine_options)
+        yield from map(_run_job, jobs)
+        return
+
+    with multiprocessing.Pool(workers, _init_worker, (programs, templates, machine_options)) as pool:
+        yield from pool.imap(_run_job, jobs, chunksize)
+
+
+# ops without effects, everything in these modules and the frame reads a worker has a copy of, minus RAND which
+# advances the prng. PRINT, CACHE, ST, entity ops, DEF and EXEC or THOTH (which can run code built from strings)
+# are effects
+PURE_MODULES = ("ops.ops_constants", "ops.ops_math", "ops.ops_trig", "ops.ops_logic", "ops.ops_stack", "ops.ops_list")
+PURE_OPS = ("UNCACHE", "LD", "LDACCESS", "STACCESS", "HALT")
+EFFECT_OPS = ("RAND",)
+
+
+def _pure_op(op: core.Operation) -> bool:
+    if op.mnemonic in EFFECT_OPS:
+        return False
+    return type(op).__module__ in PURE_MODULES or op.mnemonic in PURE_OPS
+
+
+def pure(machine: StackMachine, block: Block, seen: set = None) -> bool:
+    # True if running the block has no effect but on the stack, user definitions it calls included
+    seen = set() if seen is None else seen
+    for kind, arg, token in block.code:
+        if kind == OP:
+            if not _pure_op(arg.op if isinstance(arg, hexoptimizer.Unchecked) else arg):
+                return False
+        elif kind == CALL:
+            body = machine.frame.user_definitions.get(token)
+            if body is None:
+                op = machine.operations.get(token)
+                if op is None or not _pure_op(op):
+                    return False
+            elif token not in seen:
+                seen.add(token)
+                if not pure(machine, machine.compile_quote(body), seen):
+                    return False
+        # literals, HALT and superinstructions (stand-ins for the instructions after them) have no effects
+    return True
+
+
+_thoth_machine = None          # machine of this THOTH worker process
+_thoth_shared = (None, None)   # pickled (frame state, block) of the last task and the decoded pair
+
+
+def _init_thoth_worker(operations: dict, options: dict):
+    global _thoth_machine
+    _thoth_machine = StackMachine(**options)
+    _thoth_machine.operations = operations
+
+
+def _thoth_chunk(task: tuple):
+    # (results, history entries, number of history entries, evaluations) of THOTH over the chunk, None on an
+    # error. the entries are the last history_size of them, as many as the machine's history can hold
+    global _thoth_shared
+    shared, items = task
+    if shared != _thoth_shared[0]:
+        _thoth_shared = (shared, pickle.loads(shared))
+    state, block = _thoth_shared[1]
+    machine = _thoth_machine
+    machine.frame = _frame_from_state(machine, state)
+    machine.frame.stack.append(block)
+    machine.frame.stack.append(items)
+    history = machine._history
+    start = history.total
+    budget = machine.frame.eval_budget
+    thoth = machine.operations["THOTH"]
+    try:
+        machine.run(Block(("THOTH",), [(OP, thoth, "THOTH")]), echo=False)
+    except Exception:
+        return None
+    # leave out THOTH itself
+    count = history.total - start - 1 if machine.debug else 0
+    entries = history.tail(min(count, history.capacity))
+    used = 0 if budget is None else budget - machine.frame.eval_budget - 1
+    return machine.frame.stack[-1], entries, count, used
+
+
+def _thoth_pool(machine: StackMachine, workers: int) -> "multiprocessing.pool.Pool":
+    # the machine's THOTH workers, started on first use and again when the ops or options they were started with
+    # have changed
+    options = {
+        "debug": machine.debug,
+        "optimize": machine.optimize,
+        "native_threshold": machine.native_threshold,
+        "history_size": machine._history.capacity,
+    }
+    setup = (workers, tuple(options.items()), tuple(machine.operations.items()))
+    if machine._thoth_pool is not None:
+        if machine._thoth_pool[0] == setup:
+            return machine._thoth_pool[1]
+        machine._thoth_pool[1].terminate()
+    pool = multiprocessing.Pool(workers, _init_thoth_worker, (machine.operations, options))
+    machine._thoth_pool = (setup, pool)
+    # the workers go with the machine
+    weakref.finalize(machine, pool.terminate)
+    return pool
+
+
+def thoth(machine: StackMachine, compiled: Block, block: tuple, base: list, items: tuple) -> Optional[tuple]:
+    # the tuple THOTH collects for items, or None to map them in process
+    workers = machine.thoth_workers or os.cpu_count() or 1
+    # a history spilling to disk keeps every entry, the workers only hand back as many as fit in memory
+    if (machine.thoth_workers == 0 or workers < 2 or len(items) < machine.thoth_parallel_min or machine.profiling
+            or (machine.debug and machine._history.spills)
+            or multiprocessing.current_process().daemon or not pure(machine, compiled)):
+        return None
+
+    frame = machine.frame
+    # blocks without effects don't look at the world, it isn't sent
+    shared = pickle.dumps((_frame_state(frame, world=False), block), pickle.HIGHEST_PROTOCOL)
+    size = -(-len(items) // workers)
+    tasks = [(shared, items[idx:idx + size]) for idx in range(0, len(items), size)]
+    chunks = _thoth_pool(machine, workers).map(_thoth_chunk, tasks)
+
+    if any(chunk is None for chunk in chunks):
+        return None
+    used = sum(chunk[3] for chunk in chunks)
+    if frame.eval_budget is not None:
+        if used > frame.eval_budget:
+            return None
+        machine._spend(used)
+    for _, entries, count, _ in chunks:
+        machine._history.append_tail(count, entries)
+    return tuple(chain.from_iterable(chunk[0] for chunk in chunks))
+
+
+def _seed_range(text: str) -> range:
+    start, _, stop = text.partition(":")
+    return range(int(start), int(stop)) if stop else range(int(start), int(start) + 1)
+
+
+def _load_program(path: Path) -> Tuple[str, ...]:
+    # repl commands (lines starting with !) don't run in a sweep
+    lines = [line for line in path.read_text().splitlines() if not line.startswith("!")]
+    return hexcompiler.tokenize("\n".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run hexcast scripts across worker processes.")
+    parser.add_argument("scripts", nargs="+", type=Path)
+    parser.add_argument("--seeds", type=_seed_range, default=None, help="seed or start:stop range of seeds")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 0 runs in this process")
+    parser.add_argument("--budget", type=int, default=None, help="evaluation budget of each run")
+    parser.add_argument("--world", type=Path, default=None, help="region file mapped as the world of the templates")
+    parser.add_argument("--setup", action="append", default=[],
+                        help="hexcast run on a fresh frame to make a template, may be given more than once")
+    args = parser.parse_args(argv)
+
+    world = None if args.world is None else RegionWorld(args.world)
+    templates = []
+    for source in args.setup or [""]:
+        machine = StackMachine()
+        setup_machine(machine)
+        if world is not None:
+            machine.frame.world = world
+        machine.run_tokens(list(hexcompiler.tokenize(source)))
+        machine.frame.eval_budget = args.budget
+        templates.append(machine.frame)
+
+    programs = [_load_program(path) for path in args.scripts]
+    seeds = (None,) if args.seeds is None else args.seeds
+    for r in run_sweep(programs, templates, seeds, args.workers):
+        head = f"{args.scripts[r.program]} template {r.template} seed {r.seed}"
+        print(f"{head}: {r.evaluations} evaluations, {r.time * 1000:.3f} ms")
+        if r.mishap is not None:
+            print(f"Error: {r.mishap}")
+        print(format_stack(r.stack))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+# opt-in profiler for the StackMachine.
+# every op and user definition call the executor runs is a record on a stack of open records. a record stays open
+# until the op returns, or for EXEC and user definitions until the block it called has finished.
+#   calls: times the op or definition was run
+#   self: time spent in it, less the time spent in the ops and definitions it ran
+#   inclusive: time from the call until it finished, recursive calls are only counted by the outermost one
+# superinstructions and the native tier are bypassed while profiling so every op is timed on its own,
+# constants folded at compile time don't run and aren't counted.
+
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+SORT_KEYS = ("self", "inclusive", "calls", "name")
+
+Key = Tuple[str, str]  # ("op", mnemonic) or ("def", name)
+
+
+class Profiler:
+    def __init__(self):
+        self.stats: Dict[Key, List] = {}  # key -> [calls, self time, inclusive time]
+        self._open: List[list] = []       # [key, start, time spent in records opened inside this one]
+        self._active: Dict[Key, int] = {}
+
+    @property
+    def depth(self) -> int:
+        return len(self._open)
+
+    def enter(self, key: Key):
+        self._active[key] = self._active.get(key, 0) + 1
+        self._open.append([key, perf_counter(), 0.0])
+
+    def exit(self):
+        now = perf_counter()
+        key, start, children = self._open.pop()
+        elapsed = now - start
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed - children
+        active = self._active[key] - 1
+        self._active[key] = active
+        if active == 0:
+            stats[2] += elapsed
+        if self._open:
+            self._open[-1][2] += elapsed
+
+    def exit_to(self, depth: int):
+        while len(self._open) > depth:
+            self.exit()
+
+    def discard_to(self, depth: int):
+        # drop records left open by an error without counting them
+        while len(self._open) > depth:
+            key = self._open.pop()[0]
+            self._active[key] -= 1
+
+    def reset(self):
+        self.stats.clear()
+
+    def rows(self, sort: str = "self", kind: str = None) -> List[Tuple[str, str, int, float, float]]:
+        # (kind, name, calls, self seconds, inclusive seconds)
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}, expected one of {', '.join(SORT_KEYS)}")
+        rows = [(k, name, calls, own, inclusive) for (k, name), (calls, own, inclusive) in self.stats.items()
+                if kind is None or k == kind]
+        if sort == "name":
+            rows.sort(key=lambda row: row[1])
+        else:
+            column = {"calls": 2, "self": 3, "inclusive": 4}[sort]
+            rows.sort(key=lambda row: row[column], reverse=True)
+        return rows
+
+    def format(self, sort: str = "self", count: int = None) -> str:
+        rows = self.rows(sort)
+        if count is not None:
+            rows = rows[:count]
+        out = [f"{'name':24} {'kind':4} {'calls':>10} {'self ms':>12} {'incl ms':>12}"]
+        for kind, name, calls, own, inclusive in rows:
+            out.append(f"{name:24} {kind:4} {calls:>10} {own * 1000:>12.3f} {inclusive * 1000:>12.3f}")
+        return "\n".join(out)
@@ -0,0 +1,256 @@
+# region files, worlds on disk for hexworld.
+# a region file holds the chunks of a world, each stored as is or run length encoded, whichever is smaller, and an
+# index of where each chunk is. RegionWorld maps the file and decodes a chunk the first time a raycast or lookup
+# reaches it, so opening a world costs only the index however large the world is. decoded chunks are kept in a
+# least recently used cache holding up to max_bytes of chunks. chunks changed through set or fill stay in memory,
+# the file is never written to, use write_region to save them. region files hold blocks only, a RegionWorld starts
+# without entities.
+#
+# file layout, little endian:
+#   header  b"HEXR", u16 version, u32 chunk count
+#   index   per chunk: i32 cx, i32 cy, i32 cz, u16 blocks that aren't air, u8 encoding, u32 offset, u32 length
+#   data    the chunks, SIZE ** 3 raw block ids, or (u16 run, u8 block) pairs
+#
+# python hexregion.py blocks.json world.hexr
+#
+# converts a list of blocks to a region file. a .json file holds a list of [x, y, z] or [x, y, z, block] entries and
+# [x0, y0, z0, x1, y1, z1, block] boxes, any other file the same with one entry per line and # comments.
+
+import argparse
+from collections import OrderedDict
+import json
+import mmap
+import os
+from pathlib import Path
+import re
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, Tuple, Union
+
+from hexentities import EntityIndex
+from hexworld import World, SHIFT, SIZE, Pos
+
+MAGIC = b"HEXR"
+VERSION = 1
+CHUNK_BYTES = SIZE ** 3
+
+RAW, RLE = 0, 1
+
+_header = struct.Struct("<4sHI")
+_entry = struct.Struct("<iiiHBII")
+_run = struct.Struct("<HB")
+_runs = re.compile(rb"(.)\1*", re.S)
+
+
+def _encode(chunk: bytearray) -> Tuple[int, bytes]:
+    runs = bytearray()
+    for m in _runs.finditer(chunk):
+        runs += _run.pack(m.end() - m.start(), chunk[m.start()])
+        if len(runs) >= CHUNK_BYTES:
+            return RAW, bytes(chunk)
+    return RLE, bytes(runs)
+
+
+def _decode(encoding: int, data) -> bytearray:
+    if encoding == RAW:
+        return bytearray(data)
+    chunk = bytearray()
+    for run, block in _run.iter_unpack(data):
+        chunk += bytes((block,)) * run
+    return chunk
+
+
+def write_region(world: World, path: Union[str, Path]):
+    # chunks are encoded and written one at a time, the index is filled in last. the file is written next to path
+    # and moved over it, so a RegionWorld can be saved to the file it was opened from
+    keys = [key for key in world.chunks.keys() if world._counts.get(key)]
+    index = bytearray(_header.pack(MAGIC, VERSION, len(keys)))
+    offset = _header.size + _entry.size * len(keys)
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.seek(offset)
+        for cx, cy, cz in keys:
+            encoding, data = _encode(world.chunks[(cx, cy, cz)])
+            index += _entry.pack(cx, cy, cz, world._counts[(cx, cy, cz)], encoding, offset, len(data))
+            f.write(data)
+            offset += len(data)
+        f.seek(0)
+        f.write(index)
+    os.replace(tmp, path)
+
+
+class _ChunkCache:
+    # the chunks mapping of a RegionWorld. chunks from the file are decoded on first access and evicted least
+    # recently used first, chunks that were changed are kept apart and never evicted
+    def __init__(self, region: "RegionWorld", capacity: int):
+        self.region = region
+        self.capacity = max(1, capacity)
+        self.decoded: OrderedDict = OrderedDict()
+        self.edited: Dict[Pos, bytearray] = {}
+        self.removed = set()
+        self.loads = 0
+
+    def get(self, key: Pos, default=None):
+        chunk = self.edited.get(key)
+        if chunk is not None:
+            return chunk
+        decoded = self.decoded
+        chunk = decoded.get(key)
+        if chunk is not None:
+            decoded.move_to_end(key)
+            return chunk
+        entry = self.region.index.get(key)
+        if entry is None or key in self.removed:
+            return default
+        chunk = decoded[key] = self.region._load(entry)
+        self.loads += 1
+        if len(decoded) > self.capacity:
+            decoded.popitem(last=False)
+        return chunk
+
+    def edit(self, key: Pos) -> bytearray:
+        # the chunk at key moved out of the cache to be changed in place, None if there is none
+        chunk = self.get(key)
+        if chunk is not None and key not in self.edited:
+            self.decoded.pop(key, None)
+            self.edited[key] = chunk
+        return chunk
+
+    def __getitem__(self, key: Pos) -> bytearray:
+        chunk = self.get(key)
+        if chunk is None:
+            raise KeyError(key)
+        return chunk
+
+    def __setitem__(self, key: Pos, chunk: bytearray):
+        self.decoded.pop(key, None)
+        self.removed.discard(key)
+        self.edited[key] = chunk
+
+    def __delitem__(self, key: Pos):
+        if key not in self:
+            raise KeyError(key)
+        self.decoded.pop(key, None)
+        self.edited.pop(key, None)
+        if key in self.region.index:
+            self.removed.add(key)
+
+    def __contains__(self, key: Pos) -> bool:
+        return key in self.edited or (key in self.region.index and key not in self.removed)
+
+    def keys(self) -> Iterator[Pos]:
+        yield from self.edited
+        for key in self.region.index:
+            if key not in self.edited and key not in self.removed:
+                yield key
+
+    __iter__ = keys
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.keys())
+
+    def items(self) -> Iterator[Tuple[Pos, bytearray]]:
+        # chunks are decoded one at a time through the cache, walking a world doesn't hold all of it in memory
+        for key in self.keys():
+            yield key, self.get(key)
+
+    def memory(self) -> int:
+        return (len(self.decoded) + len(self.edited)) * CHUNK_BYTES
+
+
+class RegionWorld(World):
+    def __init__(self, path: Union[str, Path], max_bytes: int = 64 << 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _header.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a region file")
+        if version != VERSION:
+            raise ValueError(f"{self.path}: unsupported region file version {version}")
+        # (encoding, offset, length) of each chunk in the file
+        self.index: Dict[Pos, Tuple[int, int, int]] = {}
+        self._counts: Dict[Pos, int] = {}
+        for cx, cy, cz, blocks, encoding, offset, length in _entry.iter_unpack(
+                self._map[_header.size:_header.size + _entry.size * count]):
+            self.index[(cx, cy, cz)] = (encoding, offset, length)
+            self._counts[(cx, cy, cz)] = blocks
+        self.chunks = _ChunkCache(self, max_bytes // CHUNK_BYTES)
+        self.entities = EntityIndex()
+
+    def _load(self, entry: Tuple[int, int, int]) -> bytearray:
+        encoding, offset, length = entry
+        return _decode(encoding, self._map[offset:offset + length])
+
+    def set(self, x: int, y: int, z: int, block: int):
+        self.chunks.edit((x >> SHIFT, y >> SHIFT, z >> SHIFT))
+        super().set(x, y, z, block)
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        # for pool workers, which map the file again. changed chunks and the entities are sent along
+        return _reopen, (self.path, self.max_bytes, self.chunks.edited, self.chunks.removed, self.entities)
+
+
+def _reopen(path: Path, max_bytes: int, edited: Dict[Pos, bytearray], removed: set,
+            entities: EntityIndex) -> RegionWorld:
+    world = RegionWorld(path, max_bytes)
+    world.entities = entities
+    for key in removed:
+        del world.chunks[key]
+        del world._counts[key]
+    for key, chunk in edited.items():
+        world.chunks[key] = chunk
+        world._counts[key] = CHUNK_BYTES - chunk.count(0)
+    return world
+
+
+def _entries(path: Path) -> Iterable[list]:
+    if path.suffix == ".json":
+        return json.loads(path.read_text())
+    entries = []
+    for line in path.read_text().splitlines():
+        line = line.split("#", 1)[0].split()
+        if line:
+            entries.append([int(v) for v in line])
+    return entries
+
+
+def convert(source: Union[str, Path], destination: Union[str, Path]) -> World:
+    world = World()
+    for entry in _entries(Path(source)):
+        if len(entry) == 3:
+            world.set(*entry, 1)
+        elif len(entry) == 4:
+            world.set(*entry)
+        elif len(entry) == 7:
+            world.fill(entry[0:3], entry[3:6], entry[6])
+        else:
+            raise ValueError(f"bad block entry {entry}, expected x y z [block] or x0 y0 z0 x1 y1 z1 block")
+    write_region(world, destination)
+    return world
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a list of blocks to a region file.")
+    parser.add_argument("source", type=Path, help=".json list of blocks, or a text file of one block per line")
+    parser.add_argument("destination", type=Path)
+    args = parser.parse_args(argv)
+    world = convert(args.source, args.destination)
+    print(f"{args.destination}: {len(world)} blocks in {len(world.chunks)} chunks, "
+          f"{args.destination.stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,371 @@
+# numpy path for THOTH.
+# a block of literals, constants, stack shuffles and arithmetic run over a list of numbers or vectors of one type is
+# run once over the whole list. every stack slot is either a value that is the same for every element or an array
+# holding the element-wise values (a vector is three arrays, one per component), the block's ops are applied to the
+# arrays and the stacks of all the iterations are read back out of them at the end.
+#
+# numpy only stands in where it gives exactly what the python ops give: integers stay within 2**53 so int64
+# arithmetic and conversions to float agree with python's, functions without an exact numpy equivalent (SIN, ...)
+# are applied element-wise with math. anything else (other ops, division by zero, values outside a function's
+# domain, lists of mixed types) makes the path give up and THOTH runs its loop, so mishaps and Garbage play out
+# as they always do.
+#
+# "[ DROP 2 MUL 1 ADD ] 1 2 3 3 PACK THOTH"
+# runs as:
+#   [ <base stack ...>, array([1, 2, 3]), ("DROP", "2", "MUL", "1", "ADD") ]
+#   DROP -> [ <base stack ...>, array([1, 2, 3]) ]
+#   2 MUL 1 ADD -> [ <base stack ...>, array([3, 5, 7]) ]
+#
+
+import math
+from typing import List, Optional
+
+import core
+from hexcompiler import Block, PUSH, OP, FUSED, costs
+import hexnative
+import hexoptimizer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MIN_ITEMS = 32  # shorter lists run the loop
+INT_LIMIT = 2 ** 53
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Const:
+    # a value that is the same in every iteration
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Vec:
+    # vectors held as one array (or a value shared by all iterations) per component
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+def _checked(r):
+    if isinstance(r, np.ndarray) and r.dtype.kind == "i" and r.size and np.abs(r).max() > INT_LIMIT:
+        raise _Unsupported()
+    return r
+
+
+def _real(value):
+    # a value shared by every iteration used as a numpy operand
+    if type(value) not in (int, float) or (type(value) is int and abs(value) > INT_LIMIT):
+        raise _Unsupported()
+    return value
+
+
+def _int_op(fn):
+    # int64 arithmetic wraps around where python's doesn't, check the result fits from a float estimate first
+    def impl(a, b):
+        if _is_int(a) and _is_int(b):
+            estimate = fn(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+            if estimate.size and np.abs(estimate).max() > INT_LIMIT:
+                raise _Unsupported()
+        return _checked(fn(a, b))
+    return impl
+
+
+def _is_int(a) -> bool:
+    return type(a) is int or (isinstance(a, np.ndarray) and a.dtype.kind == "i")
+
+
+def _div(a, b):
+    if np.any(np.asarray(b) == 0):
+        # python raises
+        raise _Unsupported()
+    return a / b
+
+
+def _floor_like(fn, py):
+    def impl(a):
+        if _is_int(a):
+            return a
+        if not isinstance(a, np.ndarray):
+            return py(a)
+        if not np.all(np.isfinite(a)):
+            raise _Unsupported()
+        r = fn(a)
+        if r.size and np.abs(r).max() > INT_LIMIT:
+            raise _Unsupported()
+        return r.astype(np.int64)
+    return impl
+
+
+def _elementwise(fn, domain: bool):
+    def impl(a):
+        values = a.tolist()
+        if domain and not all(-1 <= v <= 1 for v in values):
+            # Garbage
+            raise _Unsupported()
+        return np.array([fn(v) for v in values], dtype=float)
+    return impl
+
+
+_add = _int_op(lambda a, b: a + b)
+_sub = _int_op(lambda a, b: a - b)
+_mul = _int_op(lambda a, b: a * b)
+
+
+def _dot(a: _Vec, b: _Vec):
+    return _add(_add(_mul(a.x, b.x), _mul(a.y, b.y)), _mul(a.z, b.z))
+
+
+def _cross(a: _Vec, b: _Vec) -> _Vec:
+    return _Vec(
+        _sub(_mul(a.y, b.z), _mul(a.z, b.y)),
+        _sub(_mul(a.z, b.x), _mul(a.x, b.z)),
+        _sub(_mul(a.x, b.y), _mul(a.y, b.x)),
+    )
+
+
+# mnemonic -> {(operand kinds): implementation}, the kinds are "num" and "vec", the same pairs as impl_dispatch
+BINARY = {
+    "ADD": {
+        ("num", "num"): _add,
+        ("vec", "vec"): lambda a, b: _Vec(_add(a.x, b.x), _add(a.y, b.y), _add(a.z, b.z)),
+        ("vec", "num"): lambda a, b: _Vec(_add(a.x, b), _add(a.y, b), _add(a.z, b)),
+        ("num", "vec"): lambda a, b: _Vec(_add(b.x, a), _add(b.y, a), _add(b.z, a)),
+    },
+    "SUB": {
+        ("num", "num"): _sub,
+        ("vec", "vec"): lambda a, b: _Vec(_sub(a.x, b.x), _sub(a.y, b.y), _sub(a.z, b.z)),
+        ("vec", "num"): lambda a, b: _Vec(_sub(a.x, b), _sub(a.y, b), _sub(a.z, b)),
+        ("num", "vec"): lambda a, b: _Vec(_sub(a, b.x), _sub(a, b.y), _sub(a, b.z)),
+    },
+    "MUL": {
+        ("num", "num"): _mul,
+        ("vec", "vec"): _dot,
+        ("vec", "num"): lambda a, b: _Vec(_mul(a.x, b), _mul(a.y, b), _mul(a.z, b)),
+        ("num", "vec"): lambda a, b: _Vec(_mul(b.x, a), _mul(b.y, a), _mul(b.z, a)),
+    },
+    "DIV": {
+        ("num", "num"): _div,
+        ("vec", "vec"): _cross,
+        ("vec", "num"): lambda a, b: _Vec(_div(a.x, b), _div(a.y, b), _div(a.z, b)),
+        ("num", "vec"): lambda a, b: _Vec(_div(a, b.x), _div(a, b.y), _div(a, b.z)),
+    },
+}
+
+_floor = _floor_like(lambda a: np.floor(a), math.floor)
+_ceil = _floor_like(lambda a: np.ceil(a), math.ceil)
+
+UNARY = {
+    "ABS": {
+        "num": lambda a: np.abs(a),
+        "vec": lambda a: np.sqrt(_dot(a, a)),
+    },
+    "FLOOR": {
+        "num": _floor,
+        "vec": lambda a: _Vec(_floor(a.x), _floor(a.y), _floor(a.z)),
+    },
+    "CEIL": {
+        "num": _ceil,
+        "vec": lambda a: _Vec(_ceil(a.x), _ceil(a.y), _ceil(a.z)),
+    },
+    "SIGN": {
+        "num": lambda a: np.where(a > 0, 1, np.where(a < 0, -1, 0)).astype(np.int64),
+    },
+}
+for _mnemonic, (_n, _fn, _domain) in hexnative.TRIG.items():
+    if _n == 1:
+        UNARY[_mnemonic] = {"num": _elementwise(getattr(math, _fn), _domain)}
+
+
+def _kind(value) -> str:
+    if isinstance(value, np.ndarray):
+        return "num"
+    if isinstance(value, _Vec):
+        return "vec"
+    raise _Unsupported()
+
+
+def _operand(value, kind: str):
+    # arrays pass through, shared values become numpy operands of the kind the op expects
+    if not isinstance(value, _Const):
+        return value
+    v = value.value
+    if kind == "vec":
+        if type(v) is not core.Vector:
+            raise _Unsupported()
+        return _Vec(_real(v.x), _real(v.y), _real(v.z))
+    return _real(v)
+
+
+def _const_kind(value) -> str:
+    v = value.value
+    if type(v) is core.Vector:
+        return "vec"
+    if type(v) in (int, float):
+        return "num"
+    raise _Unsupported()
+
+
+class _Evaluator:
+    def __init__(self, machine, stack: list):
+        self.machine = machine
+        self.stack = stack
+        self.history: List[str] = []  # tokens an iteration records in the history
+
+    def take(self, n: int) -> list:
+        if len(self.stack) < n:
+            raise _Unsupported()
+        operands = self.stack[len(self.stack) - n:]
+        del self.stack[len(self.stack) - n:]
+        return operands
+
+    def const_op(self, op: core.Operation, operands: list):
+        # every operand is shared, so is the result. run the op on them once
+        frame = core.VMFrame(self.machine)
+        frame.stack.extend(v.value for v in operands)
+        op.execute(frame)
+        self.stack.extend(_Const(v) for v in frame.stack)
+
+    def op(self, op: core.Operation):
+        mnemonic = op.mnemonic
+        module = type(op).__module__
+
+        if mnemonic in hexoptimizer.SHUFFLES and module == "ops.ops_stack":
+            n, order = hexoptimizer.SHUFFLES[mnemonic]
+            operands = self.take(n)
+            self.stack.extend(operands[idx] for idx in order)
+            return
+
+        if module not in hexoptimizer.FOLD_MODULES or mnemonic in hexoptimizer.FOLD_EXCLUDE:
+            raise _Unsupported()
+        if op.parameters is None:
+            raise _Unsupported()
+
+        operands = self.take(len(op.parameters))
+        if all(isinstance(v, _Const) for v in operands):
+            self.const_op(op, operands)
+            return
+
+        if mnemonic in BINARY:
+            a, b = operands
+            kinds = (_kind(a) if not isinstance(a, _Const) else _const_kind(a),
+                     _kind(b) if not isinstance(b, _Const) else _const_kind(b))
+            impl = BINARY[mnemonic].get(kinds)
+            if impl is None:
+                raise _Unsupported()
+            self.stack.append(impl(_operand(a, kinds[0]), _operand(b, kinds[1])))
+        elif mnemonic in UNARY:
+            a, = operands
+            impl = UNARY[mnemonic].get(_kind(a))
+            if impl is None:
+                raise _Unsupported()
+            self.stack.append(impl(a))
+        elif mnemonic == "PACKVEC":
+            self.stack.append(_Vec(*(_operand(v, "num") for v in operands)))
+        elif mnemonic == "UNPACKVEC":
+            a, = operands
+            if not isinstance(a, _Vec):
+                raise _Unsupported()
+            self.stack.extend(v if isinstance(v, np.ndarray) else _Const(v) for v in (a.x, a.y, a.z))
+        else:
+            raise _Unsupported()
+
+    def run(self, block: Block):
+        if block.tail:
+            raise _Unsupported()
+        for kind, arg, token in block.code:
+            if kind == PUSH:
+                self.stack.append(_Const(arg))
+            elif kind == FUSED:
+                # superinstructions from peephole are followed by the instructions they stand for, run those
+                if arg.skip == 0:
+                    if arg.values is None:
+                        raise _Unsupported()
+                    self.stack.extend(_Const(v) for v in arg.values)
+                    self.history.extend(arg.ops)
+            elif kind == OP:
+                self.op(arg.op if isinstance(arg, hexoptimizer.Unchecked) else arg)
+                self.history.append(token)
+            else:
+                raise _Unsupported()
+
+
+def _lane(values: list):
+    t = type(values[0])
+    if any(type(v) is not t for v in values):
+        raise _Unsupported()
+    if t is int:
+        lane = np.array(values, dtype=np.int64)
+        return _checked(lane)
+    if t is float:
+        return np.array(values, dtype=float)
+    raise _Unsupported()
+
+
+def _items(items: tuple):
+    first = type(items[0])
+    if first is core.Vector:
+        if any(type(v) is not core.Vector for v in items):
+            raise _Unsupported()
+        return _Vec(_lane([v.x for v in items]), _lane([v.y for v in items]), _lane([v.z for v in items]))
+    return _lane(list(items))
+
+
+def _column(value, n: int) -> list:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, _Vec):
+        return [core.Vector(*c) for c in zip(*(_column(v, n) for v in (value.x, value.y, value.z)))]
+    if isinstance(value, np.generic):
+        return [value.item()] * n
+    if not isinstance(value, _Const):
+        return [value] * n
+    return [value.value] * n
+
+
+def thoth(machine, compiled: Block, block: tuple, base: list, items: tuple) -> Optional[tuple]:
+    # the tuple THOTH collects for items, or None to run the loop
+    if np is None or len(items) < MIN_ITEMS or machine.profiling:
+        return None
+    frame = machine.frame
+    n = len(items)
+    if frame.eval_budget is not None and frame.eval_budget < n * costs(compiled)[-1]:
+        return None
+
+    try:
+        stack = [_Const(v) for v in base]
+        stack.append(_items(items))
+        stack.append(_Const(block))
+        evaluator = _Evaluator(machine, stack)
+        with np.errstate(all="ignore"):
+            evaluator.run(compiled)
+    except (_Unsupported, ArithmeticError, ValueError, TypeError):
+        return None
+
+    # values below the deepest slot the block touched are the base stack itself
+    shared = 0
+    while shared < len(stack) and shared < len(base) and isinstance(stack[shared], _Const) \
+            and stack[shared].value is base[shared]:
+        shared += 1
+    prefix = base[:shared]
+    columns = [_column(v, n) for v in stack[shared:]]
+
+    result = []
+    for row in zip(*columns) if columns else ((),) * n:
+        result += prefix
+        result += row
+
+    if frame.eval_budget is not None:
+        machine._spend(n * costs(compiled)[-1])
+    if machine.debug:
+        for _ in range(n):
+            for token in evaluator.history:
+                machine._history.append(token)
+    return tuple(result)
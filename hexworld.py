@@ -0,0 +1,163 @@
+# sparse voxel world for the raycast ops.
+# blocks are ids 0-255, 0 is air. the world is split into 16x16x16 chunks held in a dict by chunk coordinates,
+# a chunk is a bytearray of its blocks and chunks without blocks aren't stored, so a world costs memory only
+# where there are blocks.
+#
+# raycasts walk the blocks along the ray one face crossing at a time (Amanatides & Woo, "A Fast Voxel Traversal
+# Algorithm"), looking a block up in the chunk the ray is in and fetching a chunk only when the ray crosses
+# into the next one. as in the game, a cast reaches MAX_DISTANCE blocks and a cast starting inside a block hits
+# that block, on the face the ray points away from.
+#
+# world = World()
+# world.fill((0, 0, 0), (15, 3, 15), 1)
+# world.raycast(Vector(2.5, 8, 2.5), Vector(0, -1, 0))  -> ((2, 3, 2), (0, 1, 0))
+
+import math
+from typing import Dict, Iterator, Optional, Tuple
+
+from iota.Vector import Vector
+from hexentities import EntityIndex
+
+SHIFT = 4
+SIZE = 1 << SHIFT  # chunk edge length in blocks
+MASK = SIZE - 1
+MAX_DISTANCE = 32.0
+
+Pos = Tuple[int, int, int]
+
+
+def _index(x: int, y: int, z: int) -> int:
+    return (x & MASK) | (z & MASK) << SHIFT | (y & MASK) << (2 * SHIFT)
+
+
+class World:
+    def __init__(self):
+        self.chunks: Dict[Pos, bytearray] = {}
+        self._counts: Dict[Pos, int] = {}  # blocks that aren't air in each chunk
+        self.entities = EntityIndex()
+
+    def get(self, x: int, y: int, z: int) -> int:
+        chunk = self.chunks.get((x >> SHIFT, y >> SHIFT, z >> SHIFT))
+        return 0 if chunk is None else chunk[_index(x, y, z)]
+
+    def set(self, x: int, y: int, z: int, block: int):
+        key = (x >> SHIFT, y >> SHIFT, z >> SHIFT)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if not block:
+                return
+            chunk = self.chunks[key] = bytearray(SIZE ** 3)
+            self._counts[key] = 0
+        idx = _index(x, y, z)
+        count = self._counts[key] + bool(block) - bool(chunk[idx])
+        chunk[idx] = block
+        if count:
+            self._counts[key] = count
+        else:
+            del self.chunks[key]
+            del self._counts[key]
+
+    def fill(self, start: Pos, end: Pos, block: int):
+        # every block of the box between the corners start and end, both included
+        (x0, x1), (y0, y1), (z0, z1) = (sorted(axis) for axis in zip(start, end))
+        for y in range(y0, y1 + 1):
+            for z in range(z0, z1 + 1):
+                for x in range(x0, x1 + 1):
+                    self.set(x, y, z, block)
+
+    def blocks(self) -> Iterator[Tuple[Pos, int]]:
+        # ((x, y, z), block) of every block that isn't air
+        for (cx, cy, cz), chunk in self.chunks.items():
+            for idx, block in enumerate(chunk):
+                if block:
+                    x = cx << SHIFT | idx & MASK
+                    z = cz << SHIFT | idx >> SHIFT & MASK
+                    y = cy << SHIFT | idx >> 2 * SHIFT
+                    yield (x, y, z), block
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    def raycast(self, origin: Vector, direction: Vector, max_distance: float = MAX_DISTANCE) \
+            -> Optional[Tuple[Pos, Pos]]:
+        # (position, face normal) of the first block the ray hits, None if it hits nothing
+        ox, oy, oz = origin.x, origin.y, origin.z
+        # hypot rather than the root of the sum of squares, which under or overflows for tiny and huge directions
+        length = math.hypot(direction.x, direction.y, direction.z)
+        if length == 0:
+            return None
+        dx, dy, dz = direction.x / length, direction.y / length, direction.z / length
+        x, y, z = math.floor(ox), math.floor(oy), math.floor(oz)
+        chunks = self.chunks
+
+        key = (x >> SHIFT, y >> SHIFT, z >> SHIFT)
+        chunk = chunks.get(key)
+        if chunk is not None and chunk[(x & MASK) | (z & MASK) << SHIFT | (y & MASK) << 2 * SHIFT]:
+            return (x, y, z), _inside_normal(dx, dy, dz)
+
+        # per axis: step direction, ray distance between face crossings, distance to the next crossing
+        inf = math.inf
+        if dx > 0:
+            step_x, delta_x, next_x = 1, 1 / dx, (x + 1 - ox) / dx
+        elif dx < 0:
+            step_x, delta_x, next_x = -1, -1 / dx, (ox - x) / -dx
+        else:
+            step_x, delta_x, next_x = 0, inf, inf
+        if dy > 0:
+            step_y, delta_y, next_y = 1, 1 / dy, (y + 1 - oy) / dy
+        elif dy < 0:
+            step_y, delta_y, next_y = -1, -1 / dy, (oy - y) / -dy
+        else:
+            step_y, delta_y, next_y = 0, inf, inf
+        if dz > 0:
+            step_z, delta_z, next_z = 1, 1 / dz, (z + 1 - oz) / dz
+        elif dz < 0:
+            step_z, delta_z, next_z = -1, -1 / dz, (oz - z) / -dz
+        else:
+            step_z, delta_z, next_z = 0, inf, inf
+
+        cx, cy, cz = key
+        while True:
+            if next_x <= next_y and next_x <= next_z:
+                if next_x > max_distance:
+                    return None
+                x += step_x
+                next_x += delta_x
+                face = 0
+                if x >> SHIFT != cx:
+                    cx = x >> SHIFT
+                    chunk = chunks.get((cx, cy, cz))
+            elif next_y <= next_z:
+                if next_y > max_distance:
+                    return None
+                y += step_y
+                next_y += delta_y
+                face = 1
+                if y >> SHIFT != cy:
+                    cy = y >> SHIFT
+                    chunk = chunks.get((cx, cy, cz))
+            else:
+                if next_z > max_distance:
+                    return None
+                z += step_z
+                next_z += delta_z
+                face = 2
+                if z >> SHIFT != cz:
+                    cz = z >> SHIFT
+                    chunk = chunks.get((cx, cy, cz))
+            if chunk is not None and chunk[(x & MASK) | (z & MASK) << SHIFT | (y & MASK) << 2 * SHIFT]:
+                if face == 0:
+                    return (x, y, z), (-step_x, 0, 0)
+                if face == 1:
+                    return (x, y, z), (0, -step_y, 0)
+                return (x, y, z), (0, 0, -step_z)
+
+
+def _inside_normal(dx: float, dy: float, dz: float) -> Pos:
+    # face of a block the ray starts inside: opposite the axis the ray mostly points along
+    a, b, c = abs(dx), abs(dy), abs(dz)
+    if a >= b and a >= c:
+        return (-1 if dx > 0 else 1, 0, 0)
+    if b >= c:
+        return (0, -1 if dy > 0 else 1, 0)
+    return (0, 0, -1 if dz > 0 else 1)
@@ -1,12 +1,22 @@
 from typing import Literal, Union, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 from iota.Vector import Vector
 
 Iota = Union[bool, None, int, float, str, Tuple, Vector, "Entity"]
 
-@dataclass
+# frozen like every iota, so entities and their vectors are handed out by reference. a changed entity is a new
+# one sharing the unchanged fields, see with_data.
+# types are flags of the entity filters, an entity can have several (a cow is ANIMAL | LIVING)
+@dataclass(frozen=True, slots=True)
 class Entity:
+    ANIMAL = 1
+    MONSTER = 2
+    ITEM = 4
+    PLAYER = 8
+    LIVING = 16
+    TYPES = (ANIMAL, MONSTER, ITEM, PLAYER, LIVING)
+
     name: str
     position: Vector
     position_eyes: Vector
@@ -14,14 +24,17 @@ class Entity:
     velocity: Vector
     data_mode: Literal["r", "w", "rw"] = ""
     data: Iota = None
+    types: int = 0
 
     def copy(self):
-        return Entity(
-            self.name,
-            self.position,
-            self.position_eyes,
-            self.facing,
-            self.velocity,
-            self.data_mode,
-            self.data
-        )
\ No newline at end of file
+        return self
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def with_data(self, data: Iota, data_mode: Literal["r", "w", "rw"] = None) -> "Entity":
+        # the entity holding data, the rest of its fields are shared
+        return replace(self, data=data, data_mode=self.data_mode if data_mode is None else data_mode)
@@ -0,0 +1,282 @@
+# persistent list iota. elements are held in a height balanced (AVL) tree whose leaves are tuples of up to
+# LEAF_SIZE elements, so indexing, update, slicing and concatenation are O(log n) and share all untouched leaves
+# with the list they were made from. appending to or pushing onto a list usually just copies one leaf.
+# a HexList equals, hashes like and can be added to a tuple holding the same elements.
+
+import operator
+from typing import Iterable, Iterator, Union
+
+LEAF_SIZE = 32
+
+
+class _Node:
+    __slots__ = ("left", "right", "size", "height")
+
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.size = _size(left) + _size(right)
+        self.height = max(_height(left), _height(right)) + 1
+
+
+def _size(t) -> int:
+    return len(t) if type(t) is tuple else t.size
+
+
+def _height(t) -> int:
+    return 0 if type(t) is tuple else t.height
+
+
+def _balance(left, right):
+    # node over two trees whose heights differ by at most two
+    hl, hr = _height(left), _height(right)
+    if hl > hr + 1:
+        if _height(left.left) >= _height(left.right):
+            return _Node(left.left, _Node(left.right, right))
+        inner = left.right
+        return _Node(_Node(left.left, inner.left), _Node(inner.right, right))
+    if hr > hl + 1:
+        if _height(right.right) >= _height(right.left):
+            return _Node(_Node(left, right.left), right.right)
+        inner = right.left
+        return _Node(_Node(left, inner.left), _Node(inner.right, right.right))
+    return _Node(left, right)
+
+
+def _concat(left, right):
+    if not _size(left):
+        return right
+    if not _size(right):
+        return left
+    hl, hr = _height(left), _height(right)
+    if hl > hr + 1:
+        return _balance(left.left, _concat(left.right, right))
+    if hr > hl + 1:
+        return _balance(_concat(left, right.left), right.right)
+    if hl == hr == 0 and len(left) + len(right) <= LEAF_SIZE:
+        return left + right
+    return _Node(left, right)
+
+
+def _split(t, idx: int):
+    # (first idx elements, the rest)
+    if type(t) is tuple:
+        return t[:idx], t[idx:]
+    if idx <= 0:
+        return (), t
+    if idx >= t.size:
+        return t, ()
+    n = t.left.size if type(t.left) is not tuple else len(t.left)
+    if idx < n:
+        head, tail = _split(t.left, idx)
+        return head, _concat(tail, t.right)
+    head, tail = _split(t.right, idx - n)
+    return _concat(t.left, head), tail
+
+
+def _get(t, idx: int):
+    while type(t) is not tuple:
+        left = t.left
+        n = len(left) if type(left) is tuple else left.size
+        if idx < n:
+            t = left
+        else:
+            idx -= n
+            t = t.right
+    return t[idx]
+
+
+def _set(t, idx: int, value):
+    if type(t) is tuple:
+        return t[:idx] + (value,) + t[idx + 1:]
+    n = _size(t.left)
+    if idx < n:
+        return _Node(_set(t.left, idx, value), t.right)
+    return _Node(t.left, _set(t.right, idx - n, value))
+
+
+def _build(items: tuple):
+    # balanced tree over full leaves
+    if len(items) <= LEAF_SIZE:
+        return items
+    leaves = [items[i:i + LEAF_SIZE] for i in range(0, len(items), LEAF_SIZE)]
+
+    def build(lo, hi):
+        if hi - lo == 1:
+            return leaves[lo]
+        mid = (lo + hi) // 2
+        return _Node(build(lo, mid), build(mid, hi))
+    return build(0, len(leaves))
+
+
+def _leaves(t) -> Iterator[tuple]:
+    stack = [t]
+    while stack:
+        t = stack.pop()
+        if type(t) is tuple:
+            yield t
+        else:
+            stack.append(t.right)
+            stack.append(t.left)
+
+
+def _leaves_reversed(t) -> Iterator[tuple]:
+    stack = [t]
+    while stack:
+        t = stack.pop()
+        if type(t) is tuple:
+            yield t
+        else:
+            stack.append(t.left)
+            stack.append(t.right)
+
+
+class HexList:
+    __slots__ = ("_root", "_hash")
+
+    def __init__(self, items: Iterable = ()):
+        self._root = _build(tuple(items))
+        self._hash = None
+
+    @classmethod
+    def _of_root(cls, root) -> "HexList":
+        lst = cls.__new__(cls)
+        lst._root = root
+        lst._hash = None
+        return lst
+
+    @classmethod
+    def of(cls, lst: Union[tuple, "HexList"]) -> "HexList":
+        # the list iota as a HexList, a HexList is returned as is
+        if type(lst) is cls:
+            return lst
+        if not isinstance(lst, tuple):
+            raise TypeError(f"Expected a List, got {type(lst).__name__}")
+        return cls(lst)
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self) -> Iterator:
+        root = self._root
+        if type(root) is tuple:
+            return iter(root)
+        return (e for leaf in _leaves(root) for e in leaf)
+
+    def __reversed__(self) -> Iterator:
+        root = self._root
+        if type(root) is tuple:
+            return reversed(root)
+        return (e for leaf in _leaves_reversed(root) for e in reversed(leaf))
+
+    def __getitem__(self, key):
+        root = self._root
+        if type(root) is tuple:
+            if isinstance(key, slice):
+                return HexList._of_root(root[key])
+            return root[key]
+        n = root.size
+        if isinstance(key, slice):
+            start, stop, step = key.indices(n)
+            if step != 1:
+                return HexList(tuple(self)[key])
+            if stop <= start:
+                return HexList()
+            head, _ = _split(root, stop)
+            _, body = _split(head, start)
+            return HexList._of_root(body)
+        idx = operator.index(key)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("list index out of range")
+        return _get(root, idx)
+
+    def set(self, idx: int, value) -> "HexList":
+        # copy with the element at idx replaced
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("list assignment index out of range")
+        return HexList._of_root(_set(self._root, idx, value))
+
+    def append(self, value) -> "HexList":
+        return HexList._of_root(_concat(self._root, (value,)))
+
+    def push(self, value) -> "HexList":
+        return HexList._of_root(_concat((value,), self._root))
+
+    def __add__(self, other):
+        if type(other) is HexList:
+            return HexList._of_root(_concat(self._root, other._root))
+        if isinstance(other, tuple):
+            return HexList._of_root(_concat(self._root, _build(other)))
+        return NotImplemented
+
+    def __radd__(self, other):
+        if isinstance(other, tuple):
+            return HexList._of_root(_concat(_build(other), self._root))
+        return NotImplemented
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if type(other) is HexList:
+            if type(self._root) is tuple and type(other._root) is tuple:
+                return self._root == other._root
+        elif not isinstance(other, tuple):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        return all(a is b or a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self))
+        return self._hash
+
+    def _ordered(self, other):
+        # both sides as tuples for the ordering comparisons
+        if isinstance(other, (tuple, HexList)):
+            return tuple(self), tuple(other)
+        return None
+
+    def __lt__(self, other):
+        pair = self._ordered(other)
+        return NotImplemented if pair is None else pair[0] < pair[1]
+
+    def __le__(self, other):
+        pair = self._ordered(other)
+        return NotImplemented if pair is None else pair[0] <= pair[1]
+
+    def __gt__(self, other):
+        pair = self._ordered(other)
+        return NotImplemented if pair is None else pair[0] > pair[1]
+
+    def __ge__(self, other):
+        pair = self._ordered(other)
+        return NotImplemented if pair is None else pair[0] >= pair[1]
+
+    def __contains__(self, value) -> bool:
+        return any(e is value or e == value for e in self)
+
+    def index(self, value) -> int:
+        for idx, e in enumerate(self):
+            if e is value or e == value:
+                return idx
+        raise ValueError(f"{value!r} is not in list")
+
+    def count(self, value) -> int:
+        return sum(1 for e in self if e is value or e == value)
+
+    def __reduce__(self):
+        return HexList, (tuple(self),)
+
+    def __repr__(self):
+        # printed as a tuple so stacks holding lists print the same whichever type the lists are
+        return repr(tuple(self))
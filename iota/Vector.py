@@ -1,26 +1,51 @@
-from typing import Tuple, Union
+from typing import Union
 import math
 
 numberType = Union[int, float]
+_numbers = (int, float)  # numberType for isinstance, checking against a tuple is faster than against a Union
 
 class Vector:
-    _val: Tuple[numberType, numberType, numberType] = None
+    # value type, like every iota a Vector is never changed after it is made so instances can be shared.
+    # the components are plain slots rather than properties over a tuple, the hash is computed on first use.
+    # ZERO and the unit vectors X_POS ... Z_NEG are shared instances, so assigning to a slot raises
+    __slots__ = ("x", "y", "z", "_hash")
 
     def __init__(self, x, y, z):
-        self._val = (x,y,z)
+        # through the slot descriptors, _hash is left unset until the hash is needed
+        _set_x(self, x)
+        _set_y(self, y)
+        _set_z(self, z)
 
-    @property
-    def x(self):
-        return self._val[0]
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cannot assign to field '{name}' of Vector")
 
-    @property
-    def y(self):
-        return self._val[1]
+    def __delattr__(self, name):
+        raise AttributeError(f"cannot delete field '{name}' of Vector")
 
-    @property
-    def z(self):
-        return self._val[2]
+    def __reduce__(self):
+        return Vector, (self.x, self.y, self.z)
 
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            h = hash((self.x, self.y, self.z))
+            _set_hash(self, h)
+            return h
+
+
+    def is_finite(self) -> bool:
+        # components that are floats, or ints in float range, and neither inf nor NaN
+        try:
+            return math.isfinite(self.x) and math.isfinite(self.y) and math.isfinite(self.z)
+        except (OverflowError, TypeError):
+            return False
 
     def dot(self, other: "Vector") -> float:
         return self.x * other.x + self.y * other.y + self.z * other.z
@@ -33,22 +58,36 @@ class Vector:
         )
 
     def project_onto(self, other: "Vector") -> "Vector":
-        scale = self.dot(other) / other.dot(other)
-        return Vector(other.x * scale, other.y * scale, other.z * scale)
+        ox, oy, oz = other.x, other.y, other.z
+        scale = (self.x * ox + self.y * oy + self.z * oz) / (ox * ox + oy * oy + oz * oz)
+        return Vector(ox * scale, oy * scale, oz * scale)
 
     def magnitude(self) -> float:
-        return math.sqrt(self.dot(self))
+        x, y, z = self.x, self.y, self.z
+        return math.sqrt(x * x + y * y + z * z)
 
     def normalize(self) -> "Vector":
-        mag = self.magnitude()
+        x, y, z = self.x, self.y, self.z
+        mag = math.sqrt(x * x + y * y + z * z)
         if mag == 0:
             return Vector(0, 0, 0)
-        return Vector(self.x / mag, self.y / mag, self.z / mag)
+        return Vector(x / mag, y / mag, z / mag)
+
+    def add_scaled(self, other: "Vector", k) -> "Vector":
+        # self + other * k, e.g. the point a distance along a ray
+        return Vector(self.x + other.x * k, self.y + other.y * k, self.z + other.z * k)
+
+    def distance_squared(self, other: "Vector") -> float:
+        dx, dy, dz = self.x - other.x, self.y - other.y, self.z - other.z
+        return dx * dx + dy * dy + dz * dz
+
+    def distance(self, other: "Vector") -> float:
+        return math.sqrt(self.distance_squared(other))
 
     def clamp_to_basis(self) -> "Vector":
         x, y, z = self.x, self.y, self.z
         a, b, c = abs(x), abs(y), abs(z)
-        
+
         if b >= a and b >= c:
             max_idx = 1
         elif c >= a and c >= b:
@@ -76,16 +115,16 @@ class Vector:
         return f"Vector({self.x.__repr__()}, {self.y.__repr__()}, {self.z.__repr__()})"
 
     def __add__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x + other,
                 self.y + other,
                 self.z + other,
             )
-        
+
         if not isinstance(other, type(self)):
             raise TypeError
-        
+
         return Vector(
             self.x + other.x,
             self.y + other.y,
@@ -93,7 +132,7 @@ class Vector:
         )
 
     def __sub__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x - other,
                 self.y - other,
@@ -109,7 +148,7 @@ class Vector:
         return self.__add__(other)
 
     def __rsub__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 other - self.x,
                 other - self.y,
@@ -121,7 +160,7 @@ class Vector:
         return self.magnitude()
 
     def __mul__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x * other,
                 self.y * other,
@@ -133,7 +172,7 @@ class Vector:
         return self.__mul__(other)
 
     def __truediv__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x / other,
                 self.y / other,
@@ -142,21 +181,23 @@ class Vector:
         return self.cross(other)
 
     def __rtruediv__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 other / self.x,
                 other / self.y,
                 other / self.z,
             )
-        return other.__trudiv__(self)
-    
+        return other.__truediv__(self)
+
     def __eq__(self, other):
-        return (self.x == other.x and 
+        if not isinstance(other, Vector):
+            return NotImplemented
+        return (self.x == other.x and
                 self.y == other.y and
                 self.z == other.z)
-    
+
     def __pow__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x ** other,
                 self.y ** other,
@@ -166,43 +207,57 @@ class Vector:
             return self.project_onto(other)
         else:
             raise TypeError
-    
+
     def __rpow__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 other ** self.x,
                 other ** self.y,
                 other ** self.z
             )
-    
+
     def __floor__(self):
         return Vector(
             self.x.__floor__(),
             self.y.__floor__(),
             self.z.__floor__()
         )
-    
+
     def __ceil__(self):
         return Vector(
             self.x.__ceil__(),
             self.y.__ceil__(),
             self.z.__ceil__()
         )
-    
+
     def __mod__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 self.x % other,
                 self.y % other,
                 self.z % other,
             )
         return self.dot(other)
-    
+
     def __rmod__(self, other):
-        if isinstance(other, numberType):
+        if isinstance(other, _numbers):
             return Vector(
                 other % self.x,
                 other % self.y,
                 other % self.z,
             )
-        return self.dot(other)
\ No newline at end of file
+        return self.dot(other)
+
+
+_set_x = Vector.x.__set__
+_set_y = Vector.y.__set__
+_set_z = Vector.z.__set__
+_set_hash = Vector._hash.__set__
+
+Vector.ZERO = Vector(0, 0, 0)
+Vector.X_POS = Vector(1, 0, 0)
+Vector.X_NEG = Vector(-1, 0, 0)
+Vector.Y_POS = Vector(0, 1, 0)
+Vector.Y_NEG = Vector(0, -1, 0)
+Vector.Z_POS = Vector(0, 0, 1)
+Vector.Z_NEG = Vector(0, 0, -1)
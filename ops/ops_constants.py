@@ -69,7 +69,7 @@ class VectorOrigin(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(0, 0, 0))
+        frame.stack.append(core.Vector.ZERO)
     
     tests = [
         ("Vector(0,0,0)", "VECORIGIN", [core.Vector(0, 0, 0)]),
@@ -87,7 +87,7 @@ class VectorXPos(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(1,0,0))
+        frame.stack.append(core.Vector.X_POS)
     
     tests = [
         ("Vector(1,0,0)", "VECXPOS", [core.Vector(1, 0, 0)]),
@@ -105,7 +105,7 @@ class VectorXNeg(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(-1,0,0))
+        frame.stack.append(core.Vector.X_NEG)
 
     tests = [
         ("Vector(-1,0,0)", "VECXNEG", [core.Vector(-1,0,0)]),
@@ -123,7 +123,7 @@ class VectorYPos(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(0,1,0))
+        frame.stack.append(core.Vector.Y_POS)
     
     tests = [
         ("Vector(0,1,0)", "VECYPOS", [core.Vector(0, 1, 0)]),
@@ -141,7 +141,7 @@ class VectorYNeg(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(0,-1,0))
+        frame.stack.append(core.Vector.Y_NEG)
     
     tests = [
         ("Vector(0,-1,0)", "VECYNEG", [core.Vector(0, -1, 0)]),
@@ -159,7 +159,7 @@ class VectorZPos(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(0, 0, 1))
+        frame.stack.append(core.Vector.Z_POS)
 
     tests = [
         ("Vector(0,0,1)", "VECZPOS", [core.Vector(0, 0, 1)]),
@@ -177,7 +177,7 @@ class VectorZNeg(core.Operation):
             output=[core.Vector]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(core.Vector(0, 0, -1))
+        frame.stack.append(core.Vector.Z_NEG)
     
     tests = [
         ("Vector(0,0,-1)", "VECZNEG", [core.Vector(0, 0, -1)]),
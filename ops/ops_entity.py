@@ -14,7 +14,11 @@ class GetPlayer(core.Operation):
             output=[core.Entity]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(frame.player.copy())
+        frame.stack.append(frame.player)
+
+    tests = [
+        ("Player", "PLAYER PLAYER EQ", [True]),
+    ]
 
 class ToPosition(core.Operation):
     def __init__(self):
@@ -31,6 +35,10 @@ class ToPosition(core.Operation):
         r = e.position_eyes
         frame.stack.append(r)
 
+    tests = [
+        ("Player eyes", "PLAYER TO_POS", [core.Vector(5, 7.67, 7)]),
+    ]
+
 class ToPositionStanding(core.Operation):
     def __init__(self):
         super().__init__(
@@ -46,6 +54,10 @@ class ToPositionStanding(core.Operation):
         r = e.position
         frame.stack.append(r)
 
+    tests = [
+        ("Player feet", "PLAYER TO_POS_FEET", [core.Vector(5, 6, 7)]),
+    ]
+
 class ToFacing(core.Operation):
     def __init__(self):
         super().__init__(
@@ -61,9 +73,44 @@ class ToFacing(core.Operation):
         r = e.facing
         frame.stack.append(r)
 
+
+def _entities(frame: VMFrame):
+    # entity index of the frame's world, None without a world
+    return None if frame.world is None else frame.world.entities
+
+
+def _get_entity(frame: VMFrame, types: int = 0, exclude: bool = False):
+    # Vec -> Entity|Null, the entity at the position with (or with exclude, without) the types
+    if len(frame.stack) == 0:
+        frame.stack.append(core.Garbage())
+        return
+    pos = frame.stack.pop()
+    if type(pos) is not core.Vector or not pos.is_finite():
+        frame.stack.append(core.Garbage())
+        return
+    entities = _entities(frame)
+    frame.stack.append(None if entities is None else entities.at(pos, types, exclude))
+
+
+def _get_zone(frame: VMFrame, types: int = 0, exclude: bool = False):
+    # Vec, Num -> List[Entity], the entities in range of the position with (or with exclude, without) the types
+    if len(frame.stack) < 2:
+        frame.stack.extend(core.Garbage() for _ in range(2 - len(frame.stack)))
+        return
+    radius = frame.stack.pop()
+    pos = frame.stack.pop()
+    # an infinite radius is everything, a NaN one nothing sensible
+    if type(pos) is not core.Vector or type(radius) not in (int, float) or not pos.is_finite() or radius != radius:
+        frame.stack.append(core.Garbage())
+        frame.stack.append(core.Garbage())
+        return
+    entities = _entities(frame)
+    frame.stack.append(core.HexList(() if entities is None else entities.near(pos, radius, types, exclude)))
+
+
 # The list of entity filters because I guess an EntityType flags attribute was too much.
-# these all are (Pos -> Entity|Null)
-# they are in here for the benefit of the analysis tools. and won't be supported until an entity framework is set up
+# these all are (Pos -> Entity|Null), the entity nearest the position within half a block of it, looked up in the
+# entities of the frame's world (hexentities.EntityIndex). the filters are Entity.types flags
 class GetEntity(core.Operation):
     def __init__(self):
         super().__init__(
@@ -75,7 +122,19 @@ class GetEntity(core.Operation):
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame)
+
+    tests = [
+        ("Player feet", "PLAYER TO_POS_FEET GETENTITY PLAYER EQ", [True]),
+        ("Player eyes", "PLAYER TO_POS GETENTITY PLAYER EQ", [True]),
+        ("Nearest", "11 12 14 PACKVEC 2 DIV GETENTITY TO_POS_FEET", [core.Vector(5.5, 6, 7)]),
+        ("Nothing there", "VECORIGIN GETENTITY", [None]),
+        ("Insufficient parameters 0 of 1", "GETENTITY", [core.Garbage()]),
+        ("Invalid type", "5 GETENTITY", [core.Garbage()]),
+        ("Infinite position", "10 300 EXP 1 DIV DUP MUL 0 0 PACKVEC GETENTITY", [core.Garbage()]),
+        ("NaN position", "0 10 300 EXP 1 DIV DUP MUL DUP SUB 0 PACKVEC GETENTITY", [core.Garbage()]),
+        ("Position beyond floats", "0 0 10 400 EXP PACKVEC GETENTITY", [core.Garbage()]),
+    ]
 
 class GetEntityAnimal(core.Operation):
     def __init__(self):
@@ -88,7 +147,12 @@ class GetEntityAnimal(core.Operation):
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame, core.Entity.ANIMAL)
+
+    tests = [
+        ("Animal", "16 12 14 PACKVEC 2 DIV GETENTITY_ANIMAL TO_POS_FEET", [core.Vector(8, 6, 7)]),
+        ("Not an animal", "PLAYER TO_POS GETENTITY_ANIMAL", [None]),
+    ]
 
 class GetEntityMonster(core.Operation):
     def __init__(self):
@@ -101,7 +165,12 @@ class GetEntityMonster(core.Operation):
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame, core.Entity.MONSTER)
+
+    tests = [
+        ("Monster", "5 7 11 PACKVEC GETENTITY_MONSTER TO_POS_FEET", [core.Vector(5, 6, 11)]),
+        ("Not a monster", "8 6 7 PACKVEC GETENTITY_MONSTER", [None]),
+    ]
 
 class GetEntityItem(core.Operation):
     def __init__(self):
@@ -114,7 +183,12 @@ class GetEntityItem(core.Operation):
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame, core.Entity.ITEM)
+
+    tests = [
+        ("Item", "11 12 14 PACKVEC 2 DIV GETENTITY_ITEM TO_POS_FEET", [core.Vector(5.5, 6, 7)]),
+        ("Not an item", "8 6 7 PACKVEC GETENTITY_ITEM", [None]),
+    ]
 
 class GetEntityPlayer(core.Operation):
     def __init__(self):
@@ -127,23 +201,33 @@ class GetEntityPlayer(core.Operation):
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame, core.Entity.PLAYER)
+
+    tests = [
+        ("Player", "PLAYER TO_POS GETENTITY_PLAYER PLAYER EQ", [True]),
+        ("Not a player", "8 6 7 PACKVEC GETENTITY_PLAYER", [None]),
+    ]
 
 class GetEntityLiving(core.Operation):
     def __init__(self):
         super().__init__(
             mnemonic="GETENTITY_LIVING",
             signature="Vec -> Entity",
-            name="Get Entity At",
-            game_name="Entity Purification",
+            name="Get (Living) Entity At",
+            game_name="Entity Purification Living",
             parameters=[core.Vector],
             output=[Union[core.Entity, None]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
+        _get_entity(frame, core.Entity.LIVING)
+
+    tests = [
+        ("Living", "8 6 7 PACKVEC GETENTITY_LIVING TO_POS_FEET", [core.Vector(8, 6, 7)]),
+        ("Not living", "20 6 7 PACKVEC GETENTITY_LIVING", [None]),
+    ]
 
-# Zone Filters, same as Entity filters but grab List[Entity] around a radius
-# we will put in GetEntityZoneAny because that one makes sense.
+# Zone Filters, same as Entity filters but grab List[Entity] around a radius, every entity whose feet are within the
+# radius of the position, in the order of their handles in the world's entities.
 # if there is one suggestion for upstream it is to have an "Entity Type Purification (Entity -> EntityTypesFlag (int maybe?))"
 # there is also in the spec:
 #  monster/non-monster
@@ -162,4 +246,194 @@ class GetEntityZoneAny(core.Operation):
             output=[List[core.Entity]]
         )
     def execute(self, frame: VMFrame):
-        raise NotImplementedError("please hold for proper entity management subsystem to online.")
\ No newline at end of file
+        _get_zone(frame)
+
+    tests = [
+        ("Player only", "PLAYER TO_POS_FEET 0 GETENTITY_ZONE_ANY LEN", [1]),
+        ("Player and item", "PLAYER TO_POS_FEET 1 GETENTITY_ZONE_ANY LEN", [2]),
+        ("Everything", "PLAYER TO_POS_FEET 20 GETENTITY_ZONE_ANY LEN", [5]),
+        ("In handle order", "PLAYER TO_POS_FEET 20 GETENTITY_ZONE_ANY 0 SEL PLAYER EQ", [True]),
+        ("Nothing in range", "VECORIGIN 2 GETENTITY_ZONE_ANY", [()]),
+        ("Negative radius", "PLAYER TO_POS_FEET -1 GETENTITY_ZONE_ANY", [()]),
+        ("Insufficient parameters 1 of 2", "VECORIGIN GETENTITY_ZONE_ANY", [core.Vector(0, 0, 0), core.Garbage()]),
+        ("Invalid type", "5 5 GETENTITY_ZONE_ANY", [core.Garbage(), core.Garbage()]),
+        ("Invalid type (bool)", "VECORIGIN TRUE GETENTITY_ZONE_ANY", [core.Garbage(), core.Garbage()]),
+        ("Infinite radius", "VECORIGIN 10 300 EXP 1 DIV DUP MUL GETENTITY_ZONE_ANY LEN", [5]),
+        ("Radius beyond floats", "VECORIGIN 10 400 EXP GETENTITY_ZONE_ANY LEN", [5]),
+        ("NaN radius", "VECORIGIN 10 300 EXP 1 DIV DUP MUL DUP SUB GETENTITY_ZONE_ANY",
+            [core.Garbage(), core.Garbage()]),
+        ("Infinite position", "10 300 EXP 1 DIV DUP MUL 0 0 PACKVEC 5 GETENTITY_ZONE_ANY",
+            [core.Garbage(), core.Garbage()]),
+    ]
+
+class GetEntityZoneAnimal(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_ANIMAL",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Animal Entities Near",
+            game_name="Zone Distillation: Animal",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.ANIMAL)
+
+    tests = [
+        ("Animal", "PLAYER TO_POS_FEET 5 GETENTITY_ZONE_ANIMAL LEN", [1]),
+        ("Out of range", "PLAYER TO_POS_FEET 2 GETENTITY_ZONE_ANIMAL LEN", [0]),
+    ]
+
+class GetEntityZoneNotAnimal(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_NOT_ANIMAL",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Non-Animal Entities Near",
+            game_name="Zone Distillation: Non-Animal",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.ANIMAL, exclude=True)
+
+    tests = [
+        ("Not animals", "PLAYER TO_POS_FEET 5 GETENTITY_ZONE_NOT_ANIMAL LEN", [3]),
+    ]
+
+class GetEntityZoneMonster(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_MONSTER",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Monster Entities Near",
+            game_name="Zone Distillation: Monster",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.MONSTER)
+
+    tests = [
+        ("Monster", "PLAYER TO_POS_FEET 4 GETENTITY_ZONE_MONSTER 0 SEL TO_POS_FEET", [core.Vector(5, 6, 11)]),
+        ("Out of range", "PLAYER TO_POS_FEET 3 GETENTITY_ZONE_MONSTER", [()]),
+    ]
+
+class GetEntityZoneNotMonster(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_NOT_MONSTER",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Non-Monster Entities Near",
+            game_name="Zone Distillation: Non-Monster",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.MONSTER, exclude=True)
+
+    tests = [
+        ("Not monsters", "PLAYER TO_POS_FEET 20 GETENTITY_ZONE_NOT_MONSTER LEN", [4]),
+    ]
+
+class GetEntityZoneItem(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_ITEM",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Item Entities Near",
+            game_name="Zone Distillation: Item",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.ITEM)
+
+    tests = [
+        ("Item", "PLAYER TO_POS_FEET 2 GETENTITY_ZONE_ITEM LEN", [1]),
+    ]
+
+class GetEntityZoneNotItem(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_NOT_ITEM",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Non-Item Entities Near",
+            game_name="Zone Distillation: Non-Item",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.ITEM, exclude=True)
+
+    tests = [
+        ("Not items", "PLAYER TO_POS_FEET 2 GETENTITY_ZONE_NOT_ITEM 0 SEL PLAYER EQ", [True]),
+    ]
+
+class GetEntityZonePlayer(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_PLAYER",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Player Entities Near",
+            game_name="Zone Distillation: Player",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.PLAYER)
+
+    tests = [
+        ("Player", "PLAYER TO_POS_FEET 0 GETENTITY_ZONE_PLAYER 0 SEL PLAYER EQ", [True]),
+    ]
+
+class GetEntityZoneNotPlayer(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_NOT_PLAYER",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Non-Player Entities Near",
+            game_name="Zone Distillation: Non-Player",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.PLAYER, exclude=True)
+
+    tests = [
+        ("Not players", "PLAYER TO_POS_FEET 5 GETENTITY_ZONE_NOT_PLAYER LEN", [3]),
+    ]
+
+class GetEntityZoneLiving(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_LIVING",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Living Entities Near",
+            game_name="Zone Distillation: Living",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.LIVING)
+
+    tests = [
+        ("Living", "PLAYER TO_POS_FEET 5 GETENTITY_ZONE_LIVING LEN", [3]),
+    ]
+
+class GetEntityZoneNotLiving(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="GETENTITY_ZONE_NOT_LIVING",
+            signature="Vec, Num -> List[Entity]",
+            name="Get Non-Living Entities Near",
+            game_name="Zone Distillation: Non-Living",
+            parameters=[core.Vector, Union[int, float]],
+            output=[List[core.Entity]]
+        )
+    def execute(self, frame: VMFrame):
+        _get_zone(frame, core.Entity.LIVING, exclude=True)
+
+    tests = [
+        ("Not living", "PLAYER TO_POS_FEET 20 GETENTITY_ZONE_NOT_LIVING LEN", [2]),
+    ]
@@ -18,6 +18,19 @@ class Define(core.Operation):
         name = frame.stack.pop()
         if not isinstance(name, str):
             raise ValueError("DEF: name must be a string literal")
-        if not isinstance(block, tuple):
+        if not isinstance(block, core.LIST_TYPES):
             raise ValueError("DEF: block must be a List")
-        frame.user_definitions[name] = block
\ No newline at end of file
+        block = tuple(block)
+        if name in frame.machine.operations and name not in frame.user_definitions:
+            frame.machine.rebind()
+        # rebind rather than mutate so the frame journal can undo it
+        frame.user_definitions = {**frame.user_definitions, name: block}
+
+    tests = [
+        ("Define", "$SQUARE [ DUP MUL ] DEF 3 SQUARE", [9]),
+        ("Redefine", "$F [ 1 ] DEF $F [ 2 ] DEF F", [2]),
+        ("Shadow a builtin", "$ADD [ SUB ] DEF 5 3 ADD", [2]),
+        ("Shadow a builtin in a superinstruction", "$COPY [ DROP ] DEF 1 2 1 COPY", [1, 2]),
+        ("Shadow a builtin from EXEC", "[ $ADD [ SUB ] DEF ] EXEC 5 3 ADD", [2]),
+        ("Shadow a builtin run by EXEC", "[ 5 3 ADD ] DUP EXEC SWAP $ADD [ SUB ] DEF EXEC", [8, 2]),
+    ]
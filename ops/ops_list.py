@@ -1,5 +1,5 @@
 import core
-from core import VMFrame
+from core import VMFrame, HexList
 
 class ListPackOp(core.Operation):
     def __init__(self):
@@ -9,13 +9,20 @@ class ListPackOp(core.Operation):
             name="Create List",
             game_name="Flock's Gambit",
             parameters=None,  # dynamic type inferences not fully implemented
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         n = frame.stack.pop()
-        lst = frame.stack[-n:]
-        frame.stack = frame.stack[:-n]
-        frame.stack.append(tuple(lst))
+        # takes what stack[-n:] would, so 0 PACK packs the whole stack
+        start, _, _ = slice(-n, None).indices(len(frame.stack))
+        lst = frame.stack.popn(len(frame.stack) - start)
+        frame.stack.append(HexList(lst))
+
+    tests = [
+        ("Pack", "1 2 3 2 PACK", [1, (2, 3)]),
+        ("Pack whole stack", "1 2 3 0 PACK", [(1, 2, 3)]),
+        ("Pack more than the stack", "1 2 5 PACK", [(1, 2)]),
+    ]
 
 class ListExpandOp(core.Operation):
     def __init__(self):
@@ -29,7 +36,7 @@ class ListExpandOp(core.Operation):
         )
     def execute(self, frame: VMFrame):
         lst = frame.stack.pop()
-        frame.stack.extend(lst)
+        frame.stack.pushn(lst)
 
 class ListNewOp(core.Operation):
     def __init__(self):
@@ -39,10 +46,10 @@ class ListNewOp(core.Operation):
             name="New Empty List",
             game_name="Vacant Reflection",
             parameters=[],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
-        frame.stack.append(tuple())
+        frame.stack.append(HexList())
 
 class ListSingleOp(core.Operation):
     def __init__(self):
@@ -52,11 +59,11 @@ class ListSingleOp(core.Operation):
             name="Create list of single item",
             game_name="Single's Purification",
             parameters=[core.Iota],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         e = frame.stack.pop()
-        frame.stack.append(tuple([e]))
+        frame.stack.append(HexList((e,)))
 
 
 class SelectOp(core.Operation):
@@ -75,6 +82,13 @@ class SelectOp(core.Operation):
         r = lst[idx]
         frame.stack.append(r)
 
+    tests = [
+        ("Select", "4 5 6 3 PACK 1 SEL", [5]),
+        ("Select negative index", "4 5 6 3 PACK -1 SEL", [6]),
+        ("Select last", "4 5 6 3 PACK DUP LEN 1 SUB SEL", [6]),
+        ("Select from end", "4 5 6 3 PACK DUP LEN 3 SUB SEL", [4]),
+    ]
+
 class ReverseOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -83,11 +97,11 @@ class ReverseOp(core.Operation):
             name="Reverse List",
             game_name="Retrograde Purification",
             parameters=[tuple],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
-        lst = frame.stack.pop()
-        frame.stack.append(tuple(reversed(lst)))
+        lst = HexList.of(frame.stack.pop())
+        frame.stack.append(HexList(reversed(lst)))
 
 class ListPopOp(core.Operation):
     def __init__(self):
@@ -97,10 +111,10 @@ class ListPopOp(core.Operation):
             name="Pop from List",
             game_name="Derivation Decomposition",
             parameters=[tuple],
-            output=[tuple, core.Iota]
+            output=[HexList, core.Iota]
         )
     def execute(self, frame: VMFrame):
-        lst = frame.stack.pop()
+        lst = HexList.of(frame.stack.pop())
         e = lst[-1]
         lst = lst[:-1]
         frame.stack.append(lst)
@@ -114,14 +128,20 @@ class ListAppendOp(core.Operation):
             name="Append to List",
             game_name="Integration Distillation",
             parameters=[tuple, core.Iota],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         e = frame.stack.pop()
-        lst = frame.stack.pop()
-        r = lst + tuple([e])
+        lst = HexList.of(frame.stack.pop())
+        r = lst.append(e)
         frame.stack.append(r)
 
+    tests = [
+        ("Append", "1 2 2 PACK 3 APPEND", [(1, 2, 3)]),
+        ("Append to long list", " ".join(map(str, range(100))) + " 100 PACK 100 APPEND", [tuple(range(101))]),
+        ("Append to quote", "[ 1 2 ] 3 APPEND", [("1", "2", 3)]),
+    ]
+
 class ListPushOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -130,14 +150,19 @@ class ListPushOp(core.Operation):
             name="Left Push",
             game_name="Speaker's Distillation",
             parameters=[tuple, core.Iota],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         e = frame.stack.pop()
-        lst = frame.stack.pop()
-        r = tuple([e]) + lst
+        lst = HexList.of(frame.stack.pop())
+        r = lst.push(e)
         frame.stack.append(r)
 
+    tests = [
+        ("Push", "1 2 2 PACK 0 LISTPUSH", [(0, 1, 2)]),
+        ("Push to long list", " ".join(map(str, range(100))) + " 100 PACK -1 LISTPUSH", [tuple(range(-1, 100))]),
+    ]
+
 class ListPopLeftOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -146,10 +171,10 @@ class ListPopLeftOp(core.Operation):
             name="Pop Left",
             game_name="Speaker's Decomposition",
             parameters=[tuple],
-            output=[tuple, core.Iota]
+            output=[HexList, core.Iota]
         )
     def execute(self, frame: VMFrame):
-        lst = frame.stack.pop()
+        lst = HexList.of(frame.stack.pop())
         e = lst[0]
         lst = lst[1:]
         frame.stack.append(lst)
@@ -163,15 +188,22 @@ class ListSubListOp(core.Operation):
             name="Subarray of List",
             game_name="Selection Exaltation",
             parameters=[tuple, int, int],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         end = frame.stack.pop()
         start = frame.stack.pop()
-        lst = frame.stack.pop()
+        lst = HexList.of(frame.stack.pop())
         r = lst[start:end]
         frame.stack.append(r)
 
+    tests = [
+        ("Sublist", "1 2 3 4 4 PACK 1 3 SUBLIST", [(2, 3)]),
+        ("Sublist of long list", " ".join(map(str, range(100))) + " 100 PACK 30 70 SUBLIST", [tuple(range(30, 70))]),
+        ("Sublist negative end", " ".join(map(str, range(100))) + " 100 PACK 90 -5 SUBLIST", [tuple(range(90, 95))]),
+        ("Sublist empty", " ".join(map(str, range(100))) + " 100 PACK 70 30 SUBLIST", [()]),
+    ]
+
 class ListRemoveOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -180,16 +212,21 @@ class ListRemoveOp(core.Operation):
             name="Remove item from list",
             game_name="Excisor's Distillation",
             parameters=[tuple, int],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         idx = frame.stack.pop()
-        lst = frame.stack.pop()
+        lst = HexList.of(frame.stack.pop())
         left = lst[:idx]
         right = lst[idx+1:]
         r = left + right
         frame.stack.append(r)
 
+    tests = [
+        ("Remove", "1 2 3 3 PACK 1 REM", [(1, 3)]),
+        ("Remove from long list", " ".join(map(str, range(100))) + " 100 PACK 50 REM", [tuple(i for i in range(100) if i != 50)]),
+    ]
+
 class ListSetItemOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -198,17 +235,27 @@ class ListSetItemOp(core.Operation):
             name="Set index to item",
             game_name="Surgeon's Exaltation",
             parameters=[tuple, int, core.Iota],
-            output=[tuple]
+            output=[HexList]
         )
     def execute(self, frame: VMFrame):
         e = frame.stack.pop()
         idx = frame.stack.pop()
-        lst = frame.stack.pop()
-        left = lst[:idx]
-        right = lst[idx+1:]
-        r = left + tuple([e]) + right
+        lst = HexList.of(frame.stack.pop())
+        if -len(lst) <= idx < len(lst) and idx != -1:
+            r = lst.set(idx, e)
+        else:
+            left = lst[:idx]
+            right = lst[idx+1:]
+            r = left + (e,) + right
         frame.stack.append(r)
 
+    tests = [
+        ("Set", "1 2 3 3 PACK 1 5 SET", [(1, 5, 3)]),
+        ("Set in long list", " ".join(map(str, range(100))) + " 100 PACK 50 -1 SET", [tuple(-1 if i == 50 else i for i in range(100))]),
+        ("Set negative index", "1 2 3 3 PACK -2 5 SET", [(1, 5, 3)]),
+        ("Set past the end", "1 2 3 3 PACK 5 5 SET", [(1, 2, 3, 5)]),
+    ]
+
 class ListSearchOp(core.Operation):
     def __init__(self):
         super().__init__(
@@ -17,7 +17,7 @@ class BoolOp(core.Operation):
     def execute(self, frame: core.VMFrame):
         e = frame.stack.pop()
         if ((e == 0) or (e == False) or (e is None) or
-            (isinstance(e, tuple) and len(e) == 0)):
+            (isinstance(e, core.LIST_TYPES) and len(e) == 0)):
             frame.stack.append(False)
         else:
             frame.stack.append(True)
@@ -38,6 +38,13 @@ class EqualityOp(core.Operation):
         r = b == a
         frame.stack.append(r)
 
+    tests = [
+        ("Equal vectors", "1 2 3 PACKVEC 1 2 3 PACKVEC EQ", [True]),
+        ("Vector and constant", "1 0 0 PACKVEC VECXPOS EQ", [True]),
+        ("Vector and number", "0 0 1 PACKVEC 1 EQ", [False]),
+        ("Number and vector", "1 0 0 1 PACKVEC EQ", [False]),
+    ]
+
 class LessThanOp(core.Operation):
     def __init__(self):
         super().__init__(
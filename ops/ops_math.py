@@ -1,7 +1,16 @@
 from typing import Union
+import math
+import operator
 import core
 from core import VMFrame
 
+_REALS = (int, float)
+_NUMBERS = (int, float, complex)
+
+
+def _pairs(left, right, impl):
+    return {(a, b): impl for a in left for b in right}
+
 
 class AddOp(core.Operation):
     type_dispatch = {
@@ -9,7 +18,16 @@ class AddOp(core.Operation):
         (core.Vector, core.Vector): (core.Vector,),
         (core.Vector, core.Number): (core.Vector,),
         (core.Number, core.Vector): (core.Vector,),
-        (tuple, tuple): (tuple,),
+        **_pairs(core.LIST_TYPES, core.LIST_TYPES, (core.HexList,)),
+    }
+
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_NUMBERS, _NUMBERS, operator.add),
+        (core.Vector, core.Vector): lambda a, b: core.Vector(a.x + b.x, a.y + b.y, a.z + b.z),
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x + b, a.y + b, a.z + b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(b.x + a, b.y + a, b.z + a)),
+        **_pairs(core.LIST_TYPES, core.LIST_TYPES, lambda a, b: core.HexList.of(a) + b),
     }
 
     def __init__(self):
@@ -36,24 +54,18 @@ class AddOp(core.Operation):
         b = frame.stack.pop()
         a = frame.stack.pop()
 
-        if (not isinstance(a, self.parameters[0]) or 
-            not isinstance(b, self.parameters[1]) or
-            #  python bool is a numbers.Number
-            isinstance(a, bool) or
-            isinstance(b, bool)
-        ):
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
 
-        try:
-            r = a + b
-        except TypeError as e:
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
+        frame.stack.append(impl(a, b))
 
-        frame.stack.append(r)
+    def execute_unchecked(self, frame: core.VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
     def infer_output_type(self, args: list):
         a_type, b_type = args[0], args[1]
@@ -69,6 +81,8 @@ class AddOp(core.Operation):
         ("scalar broadcast (right)", "0 0 1 PACKVEC 1 ADD", [core.Vector(1, 1, 2)]),
         ("scalar broadcast (left)", "1 3 4 5 PACKVEC ADD", [core.Vector(4, 5, 6)]),
         ("List concatonation", "4 5 6 3 PACK 7 8 9 3 PACK ADD", [(4, 5, 6, 7, 8, 9,)]),
+        ("List and quote concatonation", "4 5 2 PACK [ 6 ] ADD", [(4, 5, "6")]),
+        ("Long list concatonation", " ".join(map(str, range(100))) + " 100 PACK DUP ADD", [tuple(range(100)) * 2]),
         ("insufficient parameters 0 of 2", "ADD", [core.Garbage(), core.Garbage()]),
         ("insufficient parameters 1 of 2", "5 ADD", [5, core.Garbage()]),
         ("invalid type (left)", "PLAYER 5 ADD", [core.Garbage(), core.Garbage()]),
@@ -80,6 +94,12 @@ class AddOp(core.Operation):
         ("incompatible types (List, Vec)", "LIST 1 0 0 PACKVEC ADD", [core.Garbage(), core.Garbage()]),
         ("incompatible types (List, str)", "LIST $pattern ADD", [core.Garbage(), core.Garbage()]),
         ("invalid types (bool)", "5 1 BOOL ADD", [core.Garbage(), core.Garbage()]),
+        ("constant expression", "2 3 ADD 4 MUL 1 SUB", [19]),
+        ("constant operand, runtime operand", "PLAYER 2 3 ADD ADD", [core.Garbage(), core.Garbage()]),
+        ("constant operand, missing operand", "2 3 MUL ADD", [6, core.Garbage()]),
+        ("proven operand types", "RAND 0 MUL 1 ADD", [1]),
+        ("unproven operand type", "RAND TRUE ADD", [core.Garbage(), core.Garbage()]),
+        ("incompatible types (complex, Vec)", "-8 1 2 DIV EXP 1 0 0 PACKVEC ADD", [core.Garbage(), core.Garbage()]),
     ]
 
 
@@ -91,6 +111,14 @@ class SubOp(core.Operation):
         (core.Number, core.Vector): (core.Vector,),
     }
 
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_NUMBERS, _NUMBERS, operator.sub),
+        (core.Vector, core.Vector): lambda a, b: core.Vector(a.x - b.x, a.y - b.y, a.z - b.z),
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x - b, a.y - b, a.z - b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(a - b.x, a - b.y, a - b.z)),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="SUB",
@@ -109,28 +137,22 @@ class SubOp(core.Operation):
         if len(frame.stack) == 1:
             frame.stack.append(core.Garbage())
             return
-        
+
         b = frame.stack.pop()
         a = frame.stack.pop()
-        
-        if (not isinstance(a, self.parameters[0]) or 
-            not isinstance(b, self.parameters[1]) or
-            #  python bool is a numbers.Number
-            isinstance(a, bool) or
-            isinstance(b, bool)
-        ):
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
 
-        try:
-            r = a - b
-        except TypeError as e:
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
-        
-        frame.stack.append(r)
+
+        frame.stack.append(impl(a, b))
+
+    def execute_unchecked(self, frame: core.VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
     def infer_output_type(self, args: list):
         a_type, b_type = args[0], args[1]
@@ -157,11 +179,19 @@ class SubOp(core.Operation):
 class MultiplyOp(core.Operation):
     type_dispatch = {
         (core.Number, core.Number): (core.Number,),
-        (core.Vector, core.Vector): (core.Vector,),
+        (core.Vector, core.Vector): (core.Number,),
         (core.Vector, core.Number): (core.Vector,),
         (core.Number, core.Vector): (core.Vector,),
     }
 
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_NUMBERS, _NUMBERS, operator.mul),
+        (core.Vector, core.Vector): core.Vector.dot,
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x * b, a.y * b, a.z * b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(b.x * a, b.y * a, b.z * a)),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="MUL",
@@ -181,28 +211,22 @@ class MultiplyOp(core.Operation):
         if len(frame.stack) == 1:
             frame.stack.append(core.Garbage())
             return
-    
-        a = frame.stack.pop()
+
         b = frame.stack.pop()
-    
-        if (not isinstance(a, self.parameters[0]) or 
-            not isinstance(b, self.parameters[1]) or
-            #  python bool is a numbers.Number
-            isinstance(a, bool) or
-            isinstance(b, bool)
-        ):
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
+        a = frame.stack.pop()
 
-        try:
-            r = a * b
-        except TypeError as e:
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
-    
-        frame.stack.append(r)
+
+        frame.stack.append(impl(a, b))
+
+    def execute_unchecked(self, frame: core.VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
     def infer_output_type(self, args: list):
         a_type, b_type = args[0], args[1]
@@ -234,6 +258,14 @@ class DivideOp(core.Operation):
         (core.Number, core.Vector): (core.Vector,),
     }
 
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_NUMBERS, _NUMBERS, operator.truediv),
+        (core.Vector, core.Vector): core.Vector.cross,
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x / b, a.y / b, a.z / b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(a / b.x, a / b.y, a / b.z)),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="DIV",
@@ -253,28 +285,22 @@ class DivideOp(core.Operation):
         if len(frame.stack) == 1:
             frame.stack.append(core.Garbage())
             return
-    
-        a = frame.stack.pop()
+
         b = frame.stack.pop()
-    
-        if (not isinstance(a, self.parameters[0]) or 
-            not isinstance(b, self.parameters[1]) or
-            #  python bool is a numbers.Number
-            isinstance(a, bool) or
-            isinstance(b, bool)
-        ):
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
+        a = frame.stack.pop()
 
-        try:
-            r = b / a
-        except TypeError as e:
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
-    
-        frame.stack.append(r)
+
+        frame.stack.append(impl(a, b))
+
+    def execute_unchecked(self, frame: core.VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
     def infer_output_type(self, args: list):
         a_type, b_type = args[0], args[1]
@@ -302,9 +328,19 @@ class AbsoluteOp(core.Operation):
     type_dispatch = {
         (core.Number,): (core.Number,),
         (core.Vector,): (core.Number,),
-        (bool,): (core.Number),
-        (tuple,): (core.Number),
+        (bool,): (core.Number,),
+        (tuple,): (core.Number,),
+        (core.HexList,): (core.Number,),
+    }
+
+    # type(a) -> implementation, any other type is Garbage
+    impl_dispatch = {
+        **dict.fromkeys(_NUMBERS, abs),
+        core.Vector: core.Vector.magnitude,
+        bool: int,
+        **dict.fromkeys(core.LIST_TYPES, len),
     }
+
     def __init__(self):
         super().__init__(
             mnemonic="ABS",
@@ -322,20 +358,20 @@ class AbsoluteOp(core.Operation):
             return
 
         a = frame.stack.pop()
-        
-        if isinstance(a, tuple):
-            r = len(a)
-        elif isinstance(a, bool):
-            r = int(a)
-        elif isinstance(a, core.Number) or isinstance(a, core.Vector):
-            r = abs(a)
-        else:
-            r = core.Garbage()
-        
-        frame.stack.append(r)
-    
+
+        impl = self.impl_dispatch.get(type(a), None)
+        if impl is None:
+            frame.stack.append(core.Garbage())
+            return
+
+        frame.stack.append(impl(a))
+
+    def execute_unchecked(self, frame: core.VMFrame):
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[type(a)](a))
+
     def infer_output_type(self, args: list):
-        a_type, b_type = args[0]
+        a_type = args[0]
         r_type = self.type_dispatch.get((a_type,), None)
         if r_type is None:
             raise ValueError("ABS: Bad operands")
@@ -355,6 +391,10 @@ class AbsoluteOp(core.Operation):
     ]
 
 class VectorPack(core.Operation):
+    type_dispatch = {
+        (core.Number, core.Number, core.Number): (core.Vector,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="PACKVEC",
@@ -395,6 +435,12 @@ class VectorPack(core.Operation):
 
         frame.stack.append(v)
     
+    def execute_unchecked(self, frame: VMFrame):
+        z = frame.stack.pop()
+        y = frame.stack.pop()
+        x = frame.stack.pop()
+        frame.stack.append(core.Vector(x=x, y=y, z=z))
+
     tests = [
         ("Vector Packing", "0 4 5 PACKVEC", [core.Vector(0, 4, 5)]),
         ("Insufficient parameters 0 of 3", "PACKVEC", [core.Garbage(), core.Garbage(), core.Garbage()]),
@@ -406,6 +452,10 @@ class VectorPack(core.Operation):
 
 
 class VectorExpand(core.Operation):
+    type_dispatch = {
+        (core.Vector,): (core.Number, core.Number, core.Number),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="UNPACKVEC",
@@ -435,15 +485,38 @@ class VectorExpand(core.Operation):
         frame.stack.append(y)
         frame.stack.append(z)
 
+    def execute_unchecked(self, frame: VMFrame):
+        v = frame.stack.pop()
+        frame.stack.append(v.x)
+        frame.stack.append(v.y)
+        frame.stack.append(v.z)
+
     tests = [
         ("Vector expansion", "3 4 5 PACKVEC UNPACKVEC", [3, 4, 5]),
         ("Insufficient parameters 0 of 1", "UNPACKVEC", [core.Garbage()]),
         ("Invalid type", "PLAYER UNPACKVEC", [core.Garbage()]),
         ("Invalid type", "3 4 5 3 PACK UNPACKVEC", [core.Garbage()]),
+        ("proven operand types", "RAND 0 MUL 4 5 PACKVEC UNPACKVEC", [0, 4, 5]),
     ]
 
 
 class ExpOp(core.Operation):
+    type_dispatch = {
+        #  negative bases with fractional exponents give complex numbers
+        (core.Number, core.Number): (Union[core.Number, complex],),
+        (core.Vector, core.Vector): (core.Vector,),
+        (core.Vector, core.Number): (core.Vector,),
+        (core.Number, core.Vector): (core.Vector,),
+    }
+
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_NUMBERS, _NUMBERS, operator.pow),
+        (core.Vector, core.Vector): core.Vector.project_onto,
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x ** b, a.y ** b, a.z ** b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(a ** b.x, a ** b.y, a ** b.z)),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="EXP",
@@ -464,25 +537,23 @@ class ExpOp(core.Operation):
         if len(frame.stack) == 1:
             frame.stack.append(core.Garbage())
             return
-        
-        n = frame.stack.pop()
-        b = frame.stack.pop()
 
-        if (isinstance(b, bool) or isinstance(n, bool)):
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
+        b = frame.stack.pop()
+        a = frame.stack.pop()
 
-        if not (isinstance(b, self.parameters[0]) and isinstance(n, self.parameters[1])):
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
 
-        r = b ** n
+        frame.stack.append(impl(a, b))
 
-        frame.stack.append(r)
+    def execute_unchecked(self, frame: VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
-    
     tests = [
         ("Numerical exponentiation", "2 4 EXP", [16]),
         ("Zero base", "0 4 EXP", [0]),
@@ -492,10 +563,25 @@ class ExpOp(core.Operation):
         ("Insufficient parameters 0 of 2", "EXP", [core.Garbage(), core.Garbage()]),
         ("Insufficient parameters 1 of 2", "2 EXP", [2, core.Garbage()]),
         ("Invalid Type", "PLAYER 2 EXP", [core.Garbage(), core.Garbage()]),
+        ("Large result", "2 20000 EXP 2 19999 EXP DIV", [2]),
+        ("Large result dropped", "2 20000 EXP DROP 7", [7]),
+        ("Large result in a quote", "[ 2 20000 EXP ] DROP 7", [7]),
+        ("Huge result compiled, not run", "[ 1 HALT 7 30000000 EXP ] EXEC", [1]),
     ]
 
 
 class FloorOp(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+        (core.Vector,): (core.Vector,),
+    }
+
+    # type(a) -> implementation, any other type is Garbage
+    impl_dispatch = {
+        **dict.fromkeys(_REALS, math.floor),
+        core.Vector: lambda a: core.Vector(a.x.__floor__(), a.y.__floor__(), a.z.__floor__()),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="FLOOR",
@@ -510,20 +596,19 @@ class FloorOp(core.Operation):
         if len(frame.stack) == 0:
             frame.stack.append(core.Garbage())
             return
-        
+
         a = frame.stack.pop()
 
-        if isinstance(a, bool):
+        impl = self.impl_dispatch.get(type(a), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             return
 
-        if not isinstance(a, self.parameters[0]):
-            frame.stack.append(core.Garbage())
-            return
-        
-        r = a.__floor__()
+        frame.stack.append(impl(a))
 
-        frame.stack.append(r)
+    def execute_unchecked(self, frame: VMFrame):
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[type(a)](a))
 
     tests = [
         ("Numeric Floor", "5 2 DIV FLOOR", [2]),
@@ -532,11 +617,23 @@ class FloorOp(core.Operation):
         ("Zero Vector Floor", "0 0 0 PACKVEC FLOOR", [core.Vector(0, 0, 0)]),
         ("Invalid type", "PLAYER FLOOR", [core.Garbage()]),
         ("Invalid type bool", "TRUE FLOOR", [core.Garbage()]),
+        ("Invalid type complex", "-8 1 2 DIV EXP FLOOR", [core.Garbage()]),
         ("Insufficient parameters 0 of 1", "FLOOR", [core.Garbage()]),
     ]
 
 
 class CeilingOp(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+        (core.Vector,): (core.Vector,),
+    }
+
+    # type(a) -> implementation, any other type is Garbage
+    impl_dispatch = {
+        **dict.fromkeys(_REALS, math.ceil),
+        core.Vector: lambda a: core.Vector(a.x.__ceil__(), a.y.__ceil__(), a.z.__ceil__()),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="CEIL",
@@ -551,20 +648,19 @@ class CeilingOp(core.Operation):
         if len(frame.stack) == 0:
             frame.stack.append(core.Garbage())
             return
-        
+
         a = frame.stack.pop()
 
-        if isinstance(a, bool):
+        impl = self.impl_dispatch.get(type(a), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             return
 
-        if not isinstance(a, self.parameters[0]):
-            frame.stack.append(core.Garbage())
-            return
-        
-        r = a.__ceil__()
+        frame.stack.append(impl(a))
 
-        frame.stack.append(r)
+    def execute_unchecked(self, frame: VMFrame):
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[type(a)](a))
 
     tests = [
         ("Numeric Floor", "5 2 DIV CEIL", [3]),
@@ -578,6 +674,21 @@ class CeilingOp(core.Operation):
 
 
 class ModulusOp(core.Operation):
+    type_dispatch = {
+        (core.Number, core.Number): (core.Number,),
+        (core.Vector, core.Vector): (core.Number,),
+        (core.Vector, core.Number): (core.Vector,),
+        (core.Number, core.Vector): (core.Vector,),
+    }
+
+    # (type(a), type(b)) -> implementation, any other pair is Garbage
+    impl_dispatch = {
+        **_pairs(_REALS, _REALS, operator.mod),
+        (core.Vector, core.Vector): core.Vector.dot,
+        **_pairs((core.Vector,), _REALS, lambda a, b: core.Vector(a.x % b, a.y % b, a.z % b)),
+        **_pairs(_REALS, (core.Vector,), lambda a, b: core.Vector(a % b.x, a % b.y, a % b.z)),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="MOD",
@@ -596,28 +707,22 @@ class ModulusOp(core.Operation):
         if len(frame.stack) == 1:
             frame.stack.append(core.Garbage())
             return
-        
+
         b = frame.stack.pop()
         a = frame.stack.pop()
-        
-        if (not isinstance(a, self.parameters[0]) or 
-            not isinstance(b, self.parameters[1]) or
-            #  python bool is a numbers.Number
-            isinstance(a, bool) or
-            isinstance(b, bool)
-        ):
-            frame.stack.append(core.Garbage())
-            frame.stack.append(core.Garbage())
-            return
 
-        try:
-            r = a % b
-        except TypeError as e:
+        impl = self.impl_dispatch.get((type(a), type(b)), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             frame.stack.append(core.Garbage())
             return
-        
-        frame.stack.append(r)
+
+        frame.stack.append(impl(a, b))
+
+    def execute_unchecked(self, frame: core.VMFrame):
+        b = frame.stack.pop()
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[(type(a), type(b))](a, b))
 
     tests = [
         ("Integer remainder", "5 2 MOD", [1]),
@@ -634,6 +739,17 @@ class ModulusOp(core.Operation):
 
 
 class SignOp(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+        (core.Vector,): (core.Vector,),
+    }
+
+    # type(a) -> implementation, any other type is Garbage
+    impl_dispatch = {
+        **dict.fromkeys(_REALS, lambda a: 1 if a > 0 else -1 if a < 0 else 0),
+        core.Vector: core.Vector.clamp_to_basis,
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="SIGN",
@@ -648,29 +764,19 @@ class SignOp(core.Operation):
         if len(frame.stack) == 0:
             frame.stack.append(core.Garbage())
             return
-        
+
         a = frame.stack.pop()
 
-        if isinstance(a, bool):
+        impl = self.impl_dispatch.get(type(a), None)
+        if impl is None:
             frame.stack.append(core.Garbage())
             return
 
-        if not isinstance(a, self.parameters[0]):
-            frame.stack.append(core.Garbage())
-            return
-        
-        if isinstance(a, core.Number):
-            if a > 0:
-                frame.stack.append(1)
-            elif a < 0:
-                frame.stack.append(-1)
-            else:
-                frame.stack.append(0)
-            return
-        elif isinstance(a, core.Vector):
-            r = a.clamp_to_basis()
-            frame.stack.append(r)
-            return
+        frame.stack.append(impl(a))
+
+    def execute_unchecked(self, frame: VMFrame):
+        a = frame.stack.pop()
+        frame.stack.append(self.impl_dispatch[type(a)](a))
 
     tests = [
         ("Numeric pos sign", "5 SIGN", [1]),
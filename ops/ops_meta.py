@@ -1,6 +1,8 @@
+import math
 import core
 from core import VMFrame
-from copy import deepcopy
+import hexvector
+import hexpool
 
 class Exec(core.Operation):
     def __init__(self):
@@ -14,12 +16,8 @@ class Exec(core.Operation):
         )
     def execute(self, frame: VMFrame):
         block = frame.stack.pop()
-        for e in block:
-            if frame.machine.verbose_exec:
-                print(e)
-            if e == "HALT":
-                break
-            frame.machine.process_token(e)
+        machine = frame.machine
+        machine.call(machine.compile_quote(block), in_exec=True)
 
 
 class Halt(core.Operation):
@@ -55,21 +53,44 @@ class Thoth(core.Operation):
     def execute(self, frame: VMFrame):
         lst = frame.stack.pop()
         block = frame.stack.pop()
-        snapshot = deepcopy(frame.stack)
+        machine = frame.machine
+        compiled = machine.compile_quote(block)
 
+        result = hexvector.thoth(machine, compiled, block, frame.stack, lst)
+        if result is None:
+            result = hexpool.thoth(machine, compiled, block, frame.stack, lst)
+        if result is not None:
+            frame.stack.append(result)
+            return
+
+        # every iteration runs on the stack itself, its changes to the stack are undone through the journal
+        # rather than running each iteration on a copy. iotas are never mutated in place so the results are shared
+        opened = frame.journal is None
+        mark = frame.begin_journal()
         result = []
+        try:
+            for item in lst:
+                frame.stack.append(item)
+                frame.stack.append(block)
 
-        for item in lst:
-            frame.stack = deepcopy(snapshot)
-            frame.stack.append(item)
-            frame.stack.append(block)
+                machine.run(compiled, in_exec=True, echo=False)
 
-            for e in block:
-                if e == "HALT":
-                    break
-                frame.machine.execute(e)
+                result += frame.stack
+                frame.rollback_stack(mark)
+        finally:
+            if opened:
+                frame.end_journal()
 
-            result += deepcopy(frame.stack)
+        frame.stack.append(tuple(result))
 
-        frame.stack = deepcopy(snapshot)
-        frame.stack.append(tuple(result))
\ No newline at end of file
+    tests = [
+        ("Map", "[ DROP 2 MUL 1 ADD ] 1 2 3 3 PACK THOTH", [(3, 5, 7)]),
+        ("Map hot block", "[ DROP 2 MUL 1 ADD ] 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20 20 PACK THOTH",
+            [(3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31, 33, 35, 37, 39, 41)]),
+        ("Map hot block, mishap", "[ DROP 2 MUL 1 ADD ] 1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 $A 19 20 20 PACK THOTH",
+            [(3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31, 33, 35, core.Garbage(), core.Garbage(), core.Garbage(), 39, 41)]),
+        ("Map long list", "[ DROP 3 MUL 2 DIV FLOOR ] " + " ".join(map(str, range(40))) + " 40 PACK THOTH",
+            [tuple(i * 3 // 2 for i in range(40))]),
+        ("Map long list, Garbage", "[ DROP 20 DIV ASIN ] " + " ".join(map(str, range(40))) + " 40 PACK THOTH",
+            [tuple(math.asin(i / 20) if i <= 20 else core.Garbage() for i in range(40))]),
+    ]
@@ -0,0 +1,94 @@
+from typing import Union
+import core
+from core import VMFrame
+
+_NORMALS = {
+    (1, 0, 0): core.Vector.X_POS,
+    (-1, 0, 0): core.Vector.X_NEG,
+    (0, 1, 0): core.Vector.Y_POS,
+    (0, -1, 0): core.Vector.Y_NEG,
+    (0, 0, 1): core.Vector.Z_POS,
+    (0, 0, -1): core.Vector.Z_NEG,
+}
+
+
+def _cast(frame: VMFrame):
+    # (hit, (position, face normal) or None) for the ray (origin, direction) on the stack. hit is False when the
+    # operands were bad (not vectors, or with inf or NaN components), they are then replaced with Garbage as the
+    # math ops do
+    if len(frame.stack) < 2:
+        frame.stack.extend(core.Garbage() for _ in range(2 - len(frame.stack)))
+        return False, None
+    direction = frame.stack.pop()
+    origin = frame.stack.pop()
+    if (type(origin) is not core.Vector or type(direction) is not core.Vector
+            or not origin.is_finite() or not direction.is_finite()):
+        frame.stack.append(core.Garbage())
+        frame.stack.append(core.Garbage())
+        return False, None
+    if frame.world is None:
+        return True, None
+    return True, frame.world.raycast(origin, direction)
+
+
+class RaycastBlock(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="RAYCAST_BLOCK",
+            signature="Vec, Vec -> Vec|Null",
+            name="Raycast for block",
+            game_name="Archer's Distillation",
+            parameters=[core.Vector, core.Vector],
+            output=[Union[core.Vector, None]]
+        )
+    def execute(self, frame: VMFrame):
+        ok, hit = _cast(frame)
+        if ok:
+            frame.stack.append(None if hit is None else core.Vector(*hit[0]))
+
+    tests = [
+        ("Hit", "1 5 5 PACKVEC 2 DIV VECXPOS RAYCAST_BLOCK", [core.Vector(10, 2, 2)]),
+        ("Hit diagonal", "1 1 1 PACKVEC 2 DIV 8 2 1 PACKVEC RAYCAST_BLOCK", [core.Vector(10, 2, 1)]),
+        ("Unnormalized direction", "1 5 5 PACKVEC 2 DIV VECXPOS 100 DIV RAYCAST_BLOCK", [core.Vector(10, 2, 2)]),
+        ("Miss", "1 5 5 PACKVEC 2 DIV VECXNEG RAYCAST_BLOCK", [None]),
+        ("Out of range", "-60 5 5 PACKVEC 2 DIV VECXPOS RAYCAST_BLOCK", [None]),
+        ("Inside a block", "21 5 5 PACKVEC 2 DIV VECXPOS RAYCAST_BLOCK", [core.Vector(10, 2, 2)]),
+        ("Zero direction", "1 5 5 PACKVEC 2 DIV VECORIGIN RAYCAST_BLOCK", [None]),
+        ("Insufficient parameters 0 of 2", "RAYCAST_BLOCK", [core.Garbage(), core.Garbage()]),
+        ("Insufficient parameters 1 of 2", "VECXPOS RAYCAST_BLOCK", [core.Vector(1, 0, 0), core.Garbage()]),
+        ("Invalid type", "VECORIGIN 1 RAYCAST_BLOCK", [core.Garbage(), core.Garbage()]),
+        ("Tiny direction", "1 5 5 PACKVEC 2 DIV VECXPOS 10 200 EXP DIV RAYCAST_BLOCK", [core.Vector(10, 2, 2)]),
+        ("Huge direction", "1 5 5 PACKVEC 2 DIV VECXPOS 10 200 EXP MUL RAYCAST_BLOCK", [core.Vector(10, 2, 2)]),
+        ("Infinite origin", "10 300 EXP 1 DIV DUP MUL 0 0 PACKVEC VECXPOS RAYCAST_BLOCK",
+            [core.Garbage(), core.Garbage()]),
+        ("NaN origin", "0 10 300 EXP 1 DIV DUP MUL DUP SUB 0 PACKVEC VECXPOS RAYCAST_BLOCK",
+            [core.Garbage(), core.Garbage()]),
+        ("Infinite direction", "VECORIGIN 10 300 EXP 1 DIV DUP MUL 0 0 PACKVEC RAYCAST_BLOCK",
+            [core.Garbage(), core.Garbage()]),
+    ]
+
+class RaycastNormal(core.Operation):
+    def __init__(self):
+        super().__init__(
+            mnemonic="RAYCAST_NORMAL",
+            signature="Vec, Vec -> Vec|Null",
+            name="Raycast for block face",
+            game_name="Architect's Distillation",
+            parameters=[core.Vector, core.Vector],
+            output=[Union[core.Vector, None]]
+        )
+    def execute(self, frame: VMFrame):
+        ok, hit = _cast(frame)
+        if ok:
+            frame.stack.append(None if hit is None else _NORMALS[hit[1]])
+
+    tests = [
+        ("Hit", "1 5 5 PACKVEC 2 DIV VECXPOS RAYCAST_NORMAL", [core.Vector(-1, 0, 0)]),
+        ("Hit from behind", "25 5 5 PACKVEC 2 DIV VECXNEG RAYCAST_NORMAL", [core.Vector(1, 0, 0)]),
+        ("Hit top", "21 22 5 PACKVEC 2 DIV VECYNEG RAYCAST_NORMAL", [core.Vector(0, 1, 0)]),
+        ("Miss", "1 5 5 PACKVEC 2 DIV VECYPOS RAYCAST_NORMAL", [None]),
+        ("Inside a block", "21 5 5 PACKVEC 2 DIV 0 -2 1 PACKVEC RAYCAST_NORMAL", [core.Vector(0, 1, 0)]),
+        ("Invalid type", "PLAYER VECXPOS RAYCAST_NORMAL", [core.Garbage(), core.Garbage()]),
+        ("Infinite origin", "10 300 EXP 1 DIV DUP MUL 0 0 PACKVEC VECXPOS RAYCAST_NORMAL",
+            [core.Garbage(), core.Garbage()]),
+    ]
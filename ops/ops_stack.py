@@ -64,8 +64,7 @@ class Replicate(core.Operation):
     def execute(self, frame: VMFrame):
         n = frame.stack.pop()
         e = frame.stack.pop()
-        lst = [e]*n
-        frame.stack.extend(lst)
+        frame.stack.pushn([e]*n)
 
 
 class SwapOp(core.Operation):
@@ -137,14 +136,19 @@ class Move(core.Operation):
     def execute(self, frame: VMFrame):
         idx = frame.stack.pop()
         if idx > 0:  # Roll
-            e = frame.stack[-idx-1]
-            del frame.stack[-idx-1]
+            e = frame.stack.dig(idx)
             frame.stack.append(e)
         elif idx < 0:  # Bury
             e = frame.stack.pop()
-            frame.stack.insert(idx, e)
+            frame.stack.bury(-idx, e)
         # else idx == 0: equiv to Drop
 
+    tests = [
+        ("Roll", "1 2 3 2 MOVE", [2, 3, 1]),
+        ("Bury", "1 2 3 -2 MOVE", [3, 1, 2]),
+        ("Zero index", "1 2 3 0 MOVE", [1, 2, 3]),
+    ]
+
 
 class Copy(core.Operation):
     def __init__(self):
@@ -159,11 +163,18 @@ class Copy(core.Operation):
     def execute(self, frame: VMFrame):
         idx = frame.stack.pop()
         if idx > 0:  # Inspect
-            e = frame.stack[-idx - 1]
+            e = frame.stack.pick(idx)
             frame.stack.append(e)
         elif idx < 0:  # Dup and Bury
             e = frame.stack[-1]
-            frame.stack.insert(idx-1, e)
+            frame.stack.bury(1 - idx, e)
+
+    tests = [
+        ("Inspect", "1 2 3 1 COPY", [1, 2, 3, 2]),
+        ("Inspect bottom of stack", "1 2 3 HEIGHT 1 SUB COPY", [1, 2, 3, 1]),
+        ("Dup and bury", "1 2 3 -1 COPY", [1, 3, 2, 3]),
+        ("Zero index", "1 2 3 0 COPY", [1, 2, 3]),
+    ]
 
 class Height(core.Operation):
     def __init__(self):
@@ -1,7 +1,12 @@
 import math
+from typing import Union
 import core
 
 class Sine(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="SIN",
@@ -24,6 +29,9 @@ class Sine(core.Operation):
             return
 
         frame.stack.append(math.sin(a))
+
+    def execute_unchecked(self, frame):
+        frame.stack.append(math.sin(frame.stack.pop()))
     
     tests = [
         ("Sine operation", "PI 4 DIV 1 ADD SIN", [math.sin((math.pi / 4.0)+1)]),
@@ -34,6 +42,10 @@ class Sine(core.Operation):
 
 
 class Cosine(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="COS",
@@ -56,6 +68,9 @@ class Cosine(core.Operation):
             return
 
         frame.stack.append(math.cos(a))
+
+    def execute_unchecked(self, frame):
+        frame.stack.append(math.cos(frame.stack.pop()))
     
     tests = [
         ("Cosine operation", "PI 4 DIV 1 ADD COS", [math.cos((math.pi / 4.0)+1)]),
@@ -66,6 +81,10 @@ class Cosine(core.Operation):
 
 
 class Tangent(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="TAN",
@@ -88,6 +107,9 @@ class Tangent(core.Operation):
             return
 
         frame.stack.append(math.tan(a))
+
+    def execute_unchecked(self, frame):
+        frame.stack.append(math.tan(frame.stack.pop()))
     
     tests = [
         ("Tangent operation", "PI 4 DIV 1 ADD TAN", [math.tan((math.pi / 4.0)+1)]),
@@ -98,6 +120,10 @@ class Tangent(core.Operation):
 
 
 class Arcsine(core.Operation):
+    type_dispatch = {
+        (core.Number,): (Union[core.Number, core.Garbage],),  # out of domain gives Garbage
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="ASIN",
@@ -124,6 +150,15 @@ class Arcsine(core.Operation):
             return
 
         frame.stack.append(math.asin(a))
+
+    def execute_unchecked(self, frame):
+        a = frame.stack.pop()
+
+        if (a > 1 or a < -1):
+            frame.stack.append(core.Garbage())
+            return
+
+        frame.stack.append(math.asin(a))
     
     tests = [
         ("Arc sine operation", "1 ASIN", [math.asin(1)]),
@@ -132,10 +167,15 @@ class Arcsine(core.Operation):
         ("Insuficient parameters 0 of 1", "ASIN", [core.Garbage()]),
         ("Invalid type", "LIST ASIN", [core.Garbage()]),
         ("Invalid type (bool)", "TRUE ASIN", [core.Garbage()]),
+        ("Proven operand type, out of domain", "RAND 2 ADD ASIN ABS", [core.Garbage()]),
     ]
 
 
 class Arccosine(core.Operation):
+    type_dispatch = {
+        (core.Number,): (Union[core.Number, core.Garbage],),  # out of domain gives Garbage
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="ACOS",
@@ -162,6 +202,15 @@ class Arccosine(core.Operation):
             return
 
         frame.stack.append(math.acos(a))
+
+    def execute_unchecked(self, frame):
+        a = frame.stack.pop()
+
+        if (a > 1 or a < -1):
+            frame.stack.append(core.Garbage())
+            return
+
+        frame.stack.append(math.acos(a))
     
     tests = [
         ("Arc cosine operation", "1 ACOS", [math.acos(1)]),
@@ -174,6 +223,10 @@ class Arccosine(core.Operation):
 
 
 class Arctangent(core.Operation):
+    type_dispatch = {
+        (core.Number,): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="ATAN",
@@ -196,6 +249,9 @@ class Arctangent(core.Operation):
             return
 
         frame.stack.append(math.atan(a))
+
+    def execute_unchecked(self, frame):
+        frame.stack.append(math.atan(frame.stack.pop()))
     
     tests = [
         ("Arc tangent operation", "1 ATAN", [math.atan(1)]),
@@ -206,6 +262,10 @@ class Arctangent(core.Operation):
 
 
 class Arctangent2(core.Operation):
+    type_dispatch = {
+        (core.Number, core.Number): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="ATAN2",
@@ -236,6 +296,11 @@ class Arctangent2(core.Operation):
             return
 
         frame.stack.append(math.atan2(x, y))
+
+    def execute_unchecked(self, frame):
+        y = frame.stack.pop()
+        x = frame.stack.pop()
+        frame.stack.append(math.atan2(x, y))
     
     tests = [
         ("Arc tangent (x,y) operation", "2 5 ATAN2", [math.atan2(2, 5)]),
@@ -247,6 +312,10 @@ class Arctangent2(core.Operation):
 
 
 class logarithm(core.Operation):
+    type_dispatch = {
+        (core.Number, core.Number): (core.Number,),
+    }
+
     def __init__(self):
         super().__init__(
             mnemonic="LOG",
@@ -277,6 +346,11 @@ class logarithm(core.Operation):
             return
 
         frame.stack.append(math.log(x, base))
+
+    def execute_unchecked(self, frame):
+        base = frame.stack.pop()
+        x = frame.stack.pop()
+        frame.stack.append(math.log(x, base))
     
     tests = [
         ("Logarithm operation", "2 5 LOG", [math.log(2, 5)]),
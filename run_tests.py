@@ -1,9 +1,12 @@
+from dataclasses import replace
 from typing import get_type_hints
 from pathlib import Path
 import sys
 
 from core import *
+from hexentities import EntityStore
 from hexmachine import StackMachine
+from hexworld import World
 
 
 def load_operations(machine: StackMachine, module):
@@ -13,11 +16,45 @@ def load_operations(machine: StackMachine, module):
             machine.register_op(member())
 
 
+def run_op_tests(machine: StackMachine, op: Operation, snapshot: VMFrame):
+    for idx, [desc, command, result] in enumerate(op.tests):
+        print(f"{idx+1}: {desc} [ {command} ]  expects: {result}", end=" ")
+        machine.frame = deepcopy(snapshot)
+        try:
+            machine.run_tokens(command.split())
+
+            if machine.frame.stack == result:
+                print("\033[92mPASSED\033[0m")
+            else:
+                print("\033[91mFAILED\033[0m ", machine.frame.stack)
+        except Exception as e:
+            print(f"\033[91mFAILED\033[0m\nEXCEPTION: {e}")
+    print()
+
+
+def entity_store(entities: list, tick: bool) -> EntityStore:
+    # the entities in an EntityStore, with a removed entity leaving a free row. with tick the store starts a step
+    # before, the player falling against gravity and the rest also moving along x, and the tick brings every
+    # entity to where it is in entities
+    store = EntityStore()
+    fall = Vector(0, 10, 0) if tick else Vector.ZERO
+    step = Vector(1, 0, 0) if tick else Vector.ZERO
+    for idx, e in enumerate(entities):
+        if idx == 0:
+            store.add(replace(e, velocity=e.velocity + fall))
+        else:
+            store.add(replace(e, position=e.position - step, position_eyes=e.position_eyes - step,
+                              velocity=e.velocity + fall + step))
+    store.remove(store.add(replace(entities[1], name="Removed")))
+    if tick:
+        store.tick(1.0, gravity=10)
+    return store
+
 
 if __name__ == "__main__":
     machine = StackMachine()
 
-    from ops import ops_math, ops_logic, ops_stack, ops_list, ops_rw, ops_meta, ops_constants, ops_entity, ops_trig
+    from ops import ops_math, ops_logic, ops_stack, ops_list, ops_rw, ops_meta, ops_constants, ops_entity, ops_trig, ops_raycast
     load_operations(machine, ops_math)
     load_operations(machine, ops_logic)
     load_operations(machine, ops_stack)
@@ -27,6 +64,7 @@ if __name__ == "__main__":
     load_operations(machine, ops_constants)
     load_operations(machine, ops_entity)
     load_operations(machine, ops_trig)
+    load_operations(machine, ops_raycast)
 
     if not machine.strict:
         from ops import ops_extensions
@@ -37,11 +75,28 @@ if __name__ == "__main__":
         position=Vector(x=5, y=6, z=7),
         position_eyes=Vector(x=5, y=7.67, z=7),
         facing=(Vector(x=5, y=7.67, z=7) + Vector(x=9, y=7.82, z=9)).normalize(),
-        velocity=Vector(x=0, y=0, z=0)
+        velocity=Vector(x=0, y=0, z=0),
+        types=Entity.PLAYER | Entity.LIVING
     )
 
     machine.player = player
 
+    # a wall across x = 10 for the raycast tests
+    world = World()
+    world.fill((10, 0, 0), (10, 9, 9), 1)
+    machine.frame.world = world
+
+    # the player and a few entities around them for the entity tests
+    entities = [player]
+    for name, feet, height, types in (
+            ("Item", Vector(5.5, 6, 7), 0, Entity.ITEM),
+            ("Cow", Vector(8, 6, 7), 1.3, Entity.ANIMAL | Entity.LIVING),
+            ("Zombie", Vector(5, 6, 11), 1.74, Entity.MONSTER | Entity.LIVING),
+            ("Arrow", Vector(20, 6, 7), 0, 0)):
+        entities.append(Entity(name, feet, feet + Vector(0, height, 0), Vector(1, 0, 0), Vector(0, 0, 0),
+                               types=types))
+    for e in entities:
+        world.entities.add(e)
 
     init_snapshot = deepcopy(machine.frame)
 
@@ -59,20 +114,17 @@ if __name__ == "__main__":
             else:
                 print(f"Running tests for {op.mnemonic} ({op.game_name}):")
 
-            for idx, [desc, command, result] in enumerate(op.tests):
-                print(f"{idx+1}: {desc} [ {command} ]  expects: {result}", end=" ")
-                machine.frame = deepcopy(init_snapshot)
-                try:
-                    for token in command.split():
-                        machine.process_token(token)
-
-                    if machine.frame.stack == result:
-                        print("\033[92mPASSED\033[0m")
-                    else:
-                        print("\033[91mFAILED\033[0m ", machine.frame.stack)
-                except Exception as e:
-                    print(f"\033[91mFAILED\033[0m\nEXCEPTION: {e}")
-            print()
+            run_op_tests(machine, op, init_snapshot)
 
         seen.add(op.mnemonic)
+
+    # the entity lookups again on worlds whose entities are an EntityStore, as added and after a tick
+    for label, tick in (("an EntityStore", False), ("an EntityStore after a tick", True)):
+        snapshot = deepcopy(init_snapshot)
+        snapshot.world = World()
+        snapshot.world.entities = entity_store(entities, tick)
+        for op in {op.mnemonic: op for op in machine.operations.values()}.values():
+            if type(op).__module__ == "ops.ops_entity" and op.mnemonic.startswith("GETENTITY"):
+                print(f"Running tests for {op.mnemonic} ({op.game_name}) on {label}:")
+                run_op_tests(machine, op, snapshot)
                 